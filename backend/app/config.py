@@ -9,11 +9,53 @@ class Config:
     SVM_MODEL_PATH = os.path.join(MODEL_DIR, "svm_model.pkl")
     NB_MODEL_PATH = os.path.join(MODEL_DIR, "nb_model.pkl")
     DT_MODEL_PATH = os.path.join(MODEL_DIR, "decision_tree_model.pkl")
+    PREPROCESSOR_PATH = os.path.join(MODEL_DIR, "preprocessor.pkl")
+    INFERENCE_PLAN_PATH = os.path.join(MODEL_DIR, "inference_plan.pkl")
+    METRICS_PATH = os.path.join(MODEL_DIR, "model_metrics.pkl")
+    TUNING_RESULTS_PATH = os.path.join(MODEL_DIR, "tuning_results.pkl")
+    MODEL_PATHS = {
+        "svm": SVM_MODEL_PATH,
+        "naiveBayes": NB_MODEL_PATH,
+        "decisionTree": DT_MODEL_PATH
+    }
 
     # ML pipeline settings
     RANDOM_STATE = 1
     TEST_SIZE = 0.2
     CV_SPLITS = 3
+    TRAINING_N_JOBS = 1  # Models fitted/evaluated concurrently; -1 uses every CPU core
+
+    # SVM settings
+    SVM_PROBABILITY = False  # Platt scaling adds an internal 5-fold fit, only needed for predict_proba
+    SVM_KERNEL_APPROXIMATION = None  # None (exact RBF SVC), "nystroem" or "rff" (random Fourier features)
+    SVM_APPROX_COMPONENTS = 300  # Dimension of the approximate kernel feature map
+    SVM_APPROX_MIN_SAMPLES = 20000  # Training rows from which the approximation replaces the exact SVC
+
+    # Hyperparameter tuning settings
+    TUNING_ENABLED = False
+    TUNING_STRATEGY = "halving"  # "halving" (successive halving) or "random"
+    TUNING_MAX_CANDIDATES = 30  # Parameter combinations sampled per model
+    TUNING_TIME_BUDGET = 600  # Seconds shared by the searches, estimated from a default fit of each model (soft limit)
+    TUNING_N_JOBS = -1  # Parallel fits over folds and candidates
+
+    # Training job settings
+    TRAINING_WORKERS = 1  # Processes running training jobs in the background
+    TRAINING_JOB_HISTORY = 50  # Finished jobs kept for status lookups
+
+    # Upload ingestion
+    COMPACT_INGESTION = True  # Parse uploads with small dtypes (float32, Int8/Int16), see app/pipeline/reader.py
+
+    # Prediction settings
+    INFERENCE_PLAN_ENABLED = True  # Transform prediction data with the compiled inference plan instead of the ColumnTransformer
+    PREDICTION_CHUNK_SIZE = 5000  # Rows per chunk when streaming batch predictions
+    MICROBATCH_ENABLED = False  # Coalesce concurrent /predict/single requests into one batch per model
+    MICROBATCH_MAX_WAIT_MS = 5  # How long the first request of a batch waits for others
+    MICROBATCH_MAX_BATCH_SIZE = 64
+    MICROBATCH_RESULT_TIMEOUT = 30  # Seconds a /predict/single request waits for its batched result before failing
+    BULK_PREDICTION_MAX_RECORDS = 100000  # Patient records accepted by one /predict/bulk request
+    PREDICTION_CACHE_ENABLED = True  # Reuse the results of rows already predicted with the same features and model files
+    PREDICTION_CACHE_MAX_ENTRIES = 100000  # Least recently used rows are evicted beyond this
+    MULTI_MODEL_N_JOBS = -1  # Models predicting the same matrix concurrently (threads) in multi-model predictions
 
     # Feature configuration
     FEATURES = ['AGE', 'EDUC', 'UDSBENTC', 'SEX', 'MOCATRAI', 'AMNDEM', 'NACCPPAG', 'AMYLPET', 'DYSILL', 'DYSILLIF']
@@ -24,7 +66,31 @@ class Config:
 
     # Data validation settings
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-    ALLOWED_EXTENSIONS = {'csv'}
+    ALLOWED_EXTENSIONS = {'csv', 'parquet', 'arrow', 'feather'}  # Parquet and Arrow IPC need the optional pyarrow package
+
+    # Visualization cache
+    VISUALIZATION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # In-memory budget for rendered charts
+    VISUALIZATION_CACHE_DIR = None  # Directory of the optional on-disk tier, disabled when None
+    VISUALIZATION_CACHE_DISK_MAX_BYTES = 512 * 1024 * 1024
+
+    # Dashboard rendering
+    VISUALIZATION_WORKERS = 4  # Processes rendering the charts of a dashboard request in parallel
+
+    # Chart images
+    VISUALIZATION_DEFAULT_FORMAT = 'png'
+    VISUALIZATION_DEFAULT_DPI = 300
+    VISUALIZATION_DPI_PRESETS = {'thumbnail': 72, 'screen': 110, 'print': 300}
+    VISUALIZATION_MIN_DPI = 36
+    VISUALIZATION_MAX_DPI = 300
+
+    # Pairplot
+    PAIRPLOT_MAX_POINTS = 3000  # Rows drawn in the scatter panels, sampled per predicted class beyond this
+    PAIRPLOT_MIN_POINTS_PER_CLASS = 50  # Keeps rare classes visible in the sample
+    PAIRPLOT_HEXBIN_MIN_ROWS = 10000  # From this many rows the lower panels show hexbin densities of all rows
+
+    # Visualization upload sessions
+    DATASET_TTL_SECONDS = 30 * 60  # Uploaded datasets expire after this long without use
+    DATASET_MAX_ENTRIES = 32
 
     # Logging
     LOG_LEVEL = 'INFO'
@@ -8,7 +8,7 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_sc
 
 from app.config import Config
 from app.core.exceptions import ModelTrainingError, PredictionError
-from app.pipeline import DataPreprocessor, ModelTrainer, Predictor
+from app.pipeline import DataPreprocessor, ModelTrainer, Predictor, model_registry, prediction_cache, read_upload, iter_upload_chunks
 from app.schemas.results import Metrics, TrainResult
 
 class AlzheimersPipeline:
@@ -18,34 +18,139 @@ class AlzheimersPipeline:
         self.data_preprocessor = DataPreprocessor()
         self.trainer = ModelTrainer()
         self.predictor = Predictor()
+        self.stage_timings = {}
 
-    def train(self, file_path, user_id=None):
-        """Train models using the provided dataset"""
+    @staticmethod
+    def _load_artifacts(model_name):
+        """Resolve the preprocessor, the model and their version from the same training run.
+
+        They are returned in a new preprocessor and predictor rather than set on the pipeline, which is
+        shared by concurrent requests: a request for another model, or a retrain, cannot swap them
+        between the transform and the prediction.
+        """
+        data_preprocessor = DataPreprocessor()
+        predictor = Predictor()
+
+        with model_registry.transaction():
+            data_preprocessor.load()
+            predictor.set_best_model(best_model_name=model_name)
+            model_version = model_registry.model_version(model_name)
+
+        return data_preprocessor, predictor, model_version
+
+    @staticmethod
+    def _load_all_artifacts():
+        """Resolve the preprocessor and every model from the same training run, for multi-model predictions."""
+        data_preprocessor = DataPreprocessor()
+        predictor = Predictor()
+
+        with model_registry.transaction():
+            data_preprocessor.load()
+            predictor.load_models()
+
+        return data_preprocessor, predictor
+
+    def _predict_with_cache(self, df_cleaned, model_name, model_version, predict_rows, probabilities=False):
+        """Predict the rows of a cleaned frame, taking the rows already predicted with the same model files
+        from the prediction cache, so that only the other rows are transformed and predicted by `predict_rows`.
+
+        `predict_rows` takes a cleaned frame and returns one result per row, or None for a row it could not predict.
+        It must use the preprocessor and model resolved with `model_version` (see `_load_artifacts`), as its
+        results are cached under that version.
+        `probabilities` tells whether the results have the class probabilities, they are cached apart.
+        """
+        if not Config.PREDICTION_CACHE_ENABLED:
+            return predict_rows(df_cleaned)
+
+        if probabilities:
+            model_name = f"{model_name}:probabilities"
+
+        row_keys = prediction_cache.row_keys(df_cleaned)
+        cached = prediction_cache.get_many(model_name, model_version, row_keys)
+        missing = np.fromiter((value is None for value in cached), dtype=bool, count=len(cached))
+
+        if not missing.any():
+            predicted = []
+        elif missing.all():
+            predicted = predict_rows(df_cleaned)
+        else:
+            predicted = predict_rows(df_cleaned[missing])
+
+        # Rows that could not be predicted are not cached
+        prediction_cache.put_many(model_name, model_version, [
+            (row_key, result.copy())
+            for row_key, result in zip(row_keys[missing].tolist(), predicted) if result is not None
+        ])
+
+        # A cached result is copied with the NACCID of the row being predicted
+        predicted = iter(predicted)
+        return [
+            next(predicted) if value is None else {**value, "NACCID": naccid}
+            for naccid, value in zip(df_cleaned.index.astype(str), cached)
+        ]
+
+    @staticmethod
+    def _predict_models(df_cleaned, data_preprocessor, predictor, model_names, ensemble):
+        """Transform a cleaned frame once and predict it with several models, see `Predictor.predict_models`."""
+        X, _ = data_preprocessor.transform(df_cleaned)
+
+        predictions, ensemble_predictions = predictor.predict_models(X, model_names, ensemble)
+
+        return predictor.build_model_results(X, predictions, ensemble_predictions)
+
+    @staticmethod
+    def _predict_rows(data_preprocessor, predictor, probabilities=False):
+        """Transform and predict a cleaned frame, for `_predict_with_cache`."""
+        def predict_rows(df_cleaned):
+            X, _ = data_preprocessor.transform(df_cleaned)
+            return predictor.predict_batch(X, probabilities)
+        return predict_rows
+
+    def save_artifacts(self):
+        """Publish the fitted preprocessor and the trained models together."""
+        with model_registry.transaction():
+            self.data_preprocessor.save()
+            self.trainer.save_models()
+
+    def train(self, file_path, user_id=None, publish=True, file_format="csv"):
+        """Train models using the provided CSV, Parquet or Arrow dataset. Pass `publish=False` to leave the saving to `save_artifacts`."""
         try:
-            # start_time = time.time()
+            self.stage_timings = {}
+            stage_start = time.perf_counter()
+
+            def end_stage(stage_name):
+                nonlocal stage_start
+                now = time.perf_counter()
+                self.stage_timings[stage_name] = now - stage_start
+                stage_start = now
 
             # Load data
-            df = pd.read_csv(file_path, skiprows=1)
+            df = read_upload(file_path, file_format)
             df.set_index("NACCID", inplace=True)
+            end_stage("loadData")
 
             df_train, df_test = self.data_preprocessor.prepare_training_data(df)
 
-            X_train, y_train = self.data_preprocessor.fit_transform(df_train)
+            X_train, y_train = self.data_preprocessor.fit_transform(df_train, save=False)
             X_test, y_test = self.data_preprocessor.transform(df_test, for_training=True)
+            end_stage("preprocess")
 
             # Train the models
             self.trainer.train_models(X_train, y_train)
+            end_stage("train")
 
             # Evaluate models
-            self.trainer.evaluate_models(X_test, y_test)
+            self.trainer.evaluate_models(X_test, y_test, save=False)
+            end_stage("evaluate")
+
+            if publish:
+                self.save_artifacts()
+                end_stage("save")
 
             # Get model metrics and best model
             model_metrics = self.trainer.get_model_metrics()
             best_model_name, _ = self.trainer.get_best_model()
 
-            # end_time = time.time()
-
-
             # Generate training results
             train_results = TrainResult(
                 userId=user_id or "user",
@@ -56,22 +161,29 @@ class AlzheimersPipeline:
                         accuracy=model_metrics["svm"]["accuracy"],
                         precision=model_metrics["svm"]["precision"],
                         recall=model_metrics["svm"]["recall"],
-                        f1Score=model_metrics["svm"]["f1Score"]
+                        f1Score=model_metrics["svm"]["f1Score"],
+                        trainingTime=model_metrics["svm"]["trainingTime"],
+                        evaluationTime=model_metrics["svm"]["evaluationTime"]
                     ),
                     "naiveBayes": Metrics(
                         accuracy=model_metrics["naiveBayes"]["accuracy"],
                         precision=model_metrics["naiveBayes"]["precision"],
                         recall=model_metrics["naiveBayes"]["recall"],
-                        f1Score=model_metrics["naiveBayes"]["f1Score"]
+                        f1Score=model_metrics["naiveBayes"]["f1Score"],
+                        trainingTime=model_metrics["naiveBayes"]["trainingTime"],
+                        evaluationTime=model_metrics["naiveBayes"]["evaluationTime"]
                     ),
                     "decisionTree": Metrics(
                         accuracy=model_metrics["decisionTree"]["accuracy"],
                         precision=model_metrics["decisionTree"]["precision"],
                         recall=model_metrics["decisionTree"]["recall"],
-                        f1Score=model_metrics["decisionTree"]["f1Score"]
+                        f1Score=model_metrics["decisionTree"]["f1Score"],
+                        trainingTime=model_metrics["decisionTree"]["trainingTime"],
+                        evaluationTime=model_metrics["decisionTree"]["evaluationTime"]
                     )
                 },
-                bestModel=best_model_name
+                bestModel=best_model_name,
+                tuning=self.trainer.cv_results or None
             )
 
             return train_results.model_dump()
@@ -79,25 +191,131 @@ class AlzheimersPipeline:
         except Exception as e:
             raise ModelTrainingError(str(e))
 
-    def predict_batch(self, file_path, model_name):
-        """Predict from CSV"""
+    def predict_batch(self, file_path, model_name, file_format="csv", model_names=None, ensemble=None, probabilities=False):
+        """Predict from CSV, Parquet or Arrow, with the class probabilities of every row if `probabilities` is set.
+
+        With `model_names` (a list of model names or "all"), the data is transformed once and predicted by each
+        of these models instead of `model_name`, optionally with their `ensemble` vote ("hard" or "soft").
+        """
         try:
-            df = pd.read_csv(file_path, skiprows=1)
+            df = read_upload(file_path, file_format)
             df.set_index("NACCID", inplace=True)
             df_cleaned = self.data_preprocessor.prepare_prediction_data(df)
 
-            X, _ = self.data_preprocessor.transform(df_cleaned)
+            if model_names:
+                data_preprocessor, predictor = self._load_all_artifacts()
+                return self._predict_models(df_cleaned, data_preprocessor, predictor, model_names, ensemble)
 
-            self.predictor.set_best_model(best_model_name=model_name)
+            data_preprocessor, predictor, model_version = self._load_artifacts(model_name)
 
-            prediction_results = self.predictor.predict_batch(X)
+            prediction_results = self._predict_with_cache(
+                df_cleaned, model_name, model_version,
+                self._predict_rows(data_preprocessor, predictor, probabilities), probabilities
+            )
             return prediction_results
 
         except Exception as e:
             raise PredictionError(str(e))
         
-    def predict_single(self, patient_data, model_name):
-        """Predict for a single patient based on patient data."""
+    def predict_batch_stream(self, file_path, model_name, chunk_size=None, file_format="csv", model_names=None, ensemble=None,
+                             probabilities=False):
+        """Predict from CSV, Parquet or Arrow in chunks of rows, yielding the results of each chunk as soon as it is ready.
+
+        `model_names`, `ensemble` and `probabilities` are the same as in `predict_batch`.
+        """
+        chunk_size = chunk_size or Config.PREDICTION_CHUNK_SIZE
+
+        try:
+            # The preprocessor and the models are resolved once for the whole file
+            if model_names:
+                data_preprocessor, predictor = self._load_all_artifacts()
+            else:
+                data_preprocessor, predictor, model_version = self._load_artifacts(model_name)
+
+            predict_rows = self._predict_rows(data_preprocessor, predictor, probabilities)
+            for chunk in iter_upload_chunks(file_path, chunk_size, file_format):
+                chunk.set_index("NACCID", inplace=True)
+                df_cleaned = data_preprocessor.prepare_prediction_data(chunk)
+
+                if model_names:
+                    yield self._predict_models(df_cleaned, data_preprocessor, predictor, model_names, ensemble)
+                else:
+                    yield self._predict_with_cache(df_cleaned, model_name, model_version, predict_rows, probabilities)
+
+        except Exception as e:
+            raise PredictionError(str(e))
+
+    def predict_bulk(self, patient_records, model_name, probabilities=False):
+        """Predict for a list of patient records (dicts) in one vectorized pass, with the class probabilities if `probabilities` is set.
+
+        Returns one entry per record in input order, with the prediction result or the error of
+        that record: invalid records are reported without failing the others.
+        """
+        try:
+            data_preprocessor, predictor, model_version = self._load_artifacts(model_name)
+
+            df, positions, errors = self.data_preprocessor.validate_records(patient_records)
+            results = {}
+
+            if len(df):
+                # Results are identified by the NACCID of the record, or by its position in the request
+                if "NACCID" in df.columns:
+                    naccid = df["NACCID"].where(df["NACCID"].notna(), pd.Series(positions, index=df.index))
+                else:
+                    naccid = pd.Series(positions, index=df.index)
+                df.index = naccid.astype(str).to_numpy()
+
+                cleaned_df = self.data_preprocessor.prepare_prediction_data(df)
+
+                def predict_complete_rows(df_cleaned):
+                    # Rows missing AGE or SEX are left out instead of failing the batch
+                    X, _ = data_preprocessor.transform(df_cleaned)
+                    complete = (X["AGE"].notna() & X["SEX"].notna()).to_numpy()
+
+                    predictions = iter(predictor.predict_batch(X[complete], probabilities) if complete.any() else [])
+                    return [next(predictions) if is_complete else None for is_complete in complete]
+
+                predictions = self._predict_with_cache(
+                    cleaned_df, model_name, model_version, predict_complete_rows, probabilities
+                )
+
+                for position, prediction in zip(positions.tolist(), predictions):
+                    if prediction is None:
+                        errors[position] = "AGE and SEX must be available for every patient."
+                    else:
+                        results[position] = prediction
+
+            return [
+                {"index": i, "status": "success", "data": results[i]} if i in results
+                else {"index": i, "status": "failed", "error": errors[i]}
+                for i in range(len(patient_records))
+            ]
+
+        except Exception as e:
+            raise PredictionError(str(e))
+
+    def predict_records(self, patient_records, model_name, probabilities=False):
+        """Predict for several single-patient records at once, as `predict_single` would for each of them.
+
+        Every row keeps the index 0 of a single-patient frame, so the results are the same as one call per record.
+        """
+        try:
+            df = pd.DataFrame(data=patient_records, index=np.zeros(len(patient_records), dtype=np.int64))
+
+            cleaned_df = self.data_preprocessor.prepare_prediction_data(df)
+
+            data_preprocessor, predictor, model_version = self._load_artifacts(model_name)
+
+            return self._predict_with_cache(
+                cleaned_df, model_name, model_version,
+                self._predict_rows(data_preprocessor, predictor, probabilities), probabilities
+            )
+        
+        except Exception as e:
+            raise PredictionError(str(e))
+
+    def predict_single(self, patient_data, model_name, probabilities=False):
+        """Predict for a single patient based on patient data, with the class probabilities if `probabilities` is set."""
         try:
             df = pd.DataFrame(data=patient_data, index=[0])
 
@@ -107,11 +325,16 @@ class AlzheimersPipeline:
             #     df.set_index("NACCID", inplace=True)
 
             cleaned_df = self.data_preprocessor.prepare_prediction_data(df)
-            X, _ = self.data_preprocessor.transform(cleaned_df)
-        
-            self.predictor.set_best_model(best_model_name=model_name)
 
-            prediction_result = self.predictor.predict_single(X)
+            data_preprocessor, predictor, model_version = self._load_artifacts(model_name)
+
+            def predict_row(df_cleaned):
+                X, _ = data_preprocessor.transform(df_cleaned)
+                return [predictor.predict_single(X, probabilities)]
+
+            prediction_result = self._predict_with_cache(
+                cleaned_df, model_name, model_version, predict_row, probabilities
+            )[0]
 
             return prediction_result
         
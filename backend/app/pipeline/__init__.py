@@ -1,5 +1,8 @@
+from app.pipeline.model_registry import ModelRegistry, model_registry
+from app.pipeline.prediction_cache import PredictionCache, prediction_cache
 from app.pipeline.preprocessor import DataPreprocessor
 from app.pipeline.trainer import ModelTrainer
 from app.pipeline.predictor import Predictor
+from app.pipeline.reader import read_upload, iter_upload_chunks, upload_format
 
-__all__ = ["DataPreprocessor", "ModelTrainer", "Predictor"]
\ No newline at end of file
+__all__ = ["ModelRegistry", "model_registry", "PredictionCache", "prediction_cache", "DataPreprocessor", "ModelTrainer", "Predictor", "read_upload", "iter_upload_chunks", "upload_format"]
\ No newline at end of file
@@ -0,0 +1,154 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+from app.core.exceptions import DataPreprocessingError
+
+# Rows of the training data the plan is checked against before it is exported
+PARITY_CHECK_ROWS = 1000
+
+# Fitted attributes of the imputers and scalers that the plan is compiled from
+FITTED_ATTRIBUTES = ("statistics_", "mean_", "scale_")
+
+
+def preprocessor_fingerprint(column_transformer: ColumnTransformer) -> str:
+    """Hash of the input columns and of the fitted statistics of a `ColumnTransformer`, which differs between two fits
+    unless they learned the same values."""
+    digest = hashlib.sha1(repr(list(getattr(column_transformer, "feature_names_in_", []))).encode())
+
+    for name, transformer, columns in getattr(column_transformer, "transformers_", []):
+        digest.update(repr((name, columns)).encode())
+
+        steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+        for step in steps:
+            for attribute in FITTED_ATTRIBUTES:
+                value = getattr(step, attribute, None)
+                if value is not None:
+                    digest.update(attribute.encode())
+                    digest.update(np.asarray(value, dtype=np.float64).tobytes())
+
+    return digest.hexdigest()
+
+
+class InferencePlan:
+    """The fitted preprocessing `ColumnTransformer` reduced to plain NumPy arrays.
+
+    Every output column is one input column with its missing values filled, centered and
+    scaled: `(where(isnan(x), fill, x) - mean) / scale`. Columns without an imputer keep
+    their missing values (fill is NaN) and columns without a scaler have a mean of 0 and a
+    scale of 1, so the whole transform is one vectorized step over the feature matrix,
+    without the per-transformer validation, copies and `hstack` of the sklearn path.
+
+    Only imputers (`SimpleImputer` on NaN), `StandardScaler`, pipelines of those and
+    passthrough columns can be compiled, `compile` raises `DataPreprocessingError` otherwise.
+    """
+
+    def __init__(self, feature_names_in, input_columns, fill_values, means, scales, fingerprint=None):
+        self.feature_names_in = list(feature_names_in)
+        self.input_columns = list(input_columns)  # Input column of every output column, in output order
+        self.fill_values = np.asarray(fill_values, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.has_fill = bool((~np.isnan(self.fill_values)).any())
+        self.fingerprint = fingerprint  # `preprocessor_fingerprint` of the preprocessor the plan was compiled from
+
+    @classmethod
+    def compile(cls, column_transformer: ColumnTransformer) -> "InferencePlan":
+        """Build the plan of a fitted `ColumnTransformer`."""
+        feature_names_in = list(column_transformer.feature_names_in_)
+        feature_names_out = list(column_transformer.get_feature_names_out())
+        fill_values, means, scales = [], [], []
+
+        # Imputers and scalers map every input column to the output column of the same name
+        if not set(feature_names_out) <= set(feature_names_in):
+            raise DataPreprocessingError("Inference plan columns do not match the preprocessor output.")
+
+        for name, output_slice in sorted(column_transformer.output_indices_.items(), key=lambda item: item[1].start):
+            n_columns = output_slice.stop - output_slice.start
+            if n_columns == 0:
+                continue
+
+            fill, mean, scale = cls._compile_steps(name, column_transformer.named_transformers_[name], n_columns)
+            fill_values.extend(fill)
+            means.extend(mean)
+            scales.extend(scale)
+
+        if len(fill_values) != len(feature_names_out):
+            raise DataPreprocessingError("Inference plan columns do not match the preprocessor output.")
+
+        return cls(
+            feature_names_in, feature_names_out, fill_values, means, scales,
+            fingerprint=preprocessor_fingerprint(column_transformer)
+        )
+
+    @staticmethod
+    def _compile_steps(name, transformer, n_columns):
+        fill = np.full(n_columns, np.nan)
+        mean = np.zeros(n_columns)
+        scale = np.ones(n_columns)
+
+        steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+        for step in steps:
+            if step == "passthrough" or (isinstance(step, FunctionTransformer) and step.func is None):
+                continue
+
+            if isinstance(step, SimpleImputer):
+                statistics = np.asarray(step.statistics_, dtype=np.float64)
+                # Filling after scaling, or dropping empty features, changes the shape of the math
+                imputes_nan = isinstance(step.missing_values, float) and np.isnan(step.missing_values)
+                if step.add_indicator or not imputes_nan or np.isnan(statistics).any() or mean.any() or (scale != 1).any():
+                    raise DataPreprocessingError(f"Imputer of '{name}' cannot be compiled to an inference plan.")
+                fill = statistics
+
+            elif isinstance(step, StandardScaler):
+                # ((x - mean) / scale - step_mean) / step_scale == (x - (mean + step_mean * scale)) / (scale * step_scale)
+                if step.with_mean:
+                    mean = mean + step.mean_ * scale
+                if step.with_std:
+                    scale = scale * step.scale_
+
+            else:
+                raise DataPreprocessingError(
+                    f"{type(step).__name__} of '{name}' cannot be compiled to an inference plan."
+                )
+
+        return fill, mean, scale
+
+    def matches(self, column_transformer: ColumnTransformer) -> bool:
+        """Whether the plan was compiled from this fitted preprocessor, or one with the same columns and statistics.
+
+        Plans exported without a fingerprint never match.
+        """
+        if self.feature_names_in != list(getattr(column_transformer, "feature_names_in_", [])):
+            return False
+
+        fingerprint = getattr(self, "fingerprint", None)
+        return fingerprint is not None and fingerprint == preprocessor_fingerprint(column_transformer)
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Transform cleaned features, same columns and values as the `ColumnTransformer` (as float64)."""
+        values = X[self.input_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        if self.has_fill:
+            missing = np.isnan(values)
+            if missing.any():
+                np.copyto(values, self.fill_values, where=missing & ~np.isnan(self.fill_values))
+
+        values -= self.means
+        values /= self.scales
+
+        return pd.DataFrame(values, index=X.index, columns=self.input_columns)
+
+    def check_parity(self, column_transformer: ColumnTransformer, X: pd.DataFrame):
+        """Raise `DataPreprocessingError` unless the plan reproduces the `ColumnTransformer` on `X`."""
+        X = X[self.feature_names_in].astype(np.float64)
+        expected = column_transformer.transform(X)
+        actual = self.transform(X).to_numpy()
+
+        if expected.shape != actual.shape or not np.allclose(expected, actual, equal_nan=True):
+            raise DataPreprocessingError("Inference plan does not reproduce the preprocessor output.")
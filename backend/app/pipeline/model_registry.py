@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+import joblib
+
+from app.config import Config
+from app.core.exceptions import ModelNotFoundError
+
+class ModelRegistry:
+    """Process-wide cache of the artifacts stored in `Config.MODEL_DIR`.
+
+    Each artifact is unpickled once and kept in memory keyed by its path. The file's
+    modification time and size are stored with it, so an artifact rewritten by a
+    retrain is reloaded automatically on the next access.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._artifacts = {}
+
+    def _signature(self, filepath):
+        stat = os.stat(filepath)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, filepath):
+        """Return the unpickled artifact at `filepath`, loading it only if it changed on disk."""
+        with self._lock:
+            try:
+                signature = self._signature(filepath)
+            except FileNotFoundError:
+                self._artifacts.pop(filepath, None)
+                raise ModelNotFoundError(f"Artifact not found: {os.path.basename(filepath)}")
+
+            cached = self._artifacts.get(filepath)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            artifact = joblib.load(filepath)
+            self._artifacts[filepath] = (signature, artifact)
+            return artifact
+
+    def version(self, filepaths):
+        """Fingerprint of the artifacts at `filepaths`, changes whenever one of them is rewritten."""
+        signatures = []
+        for filepath in filepaths:
+            try:
+                signatures.append((filepath, self._signature(filepath)))
+            except (FileNotFoundError, TypeError):
+                signatures.append((filepath, None))
+
+        return hashlib.sha1(repr(signatures).encode()).hexdigest()[:16]
+
+    def model_version(self, model_name):
+        """Fingerprint of the preprocessor and model used to predict with `model_name`."""
+        return self.version([Config.PREPROCESSOR_PATH, Config.MODEL_PATHS.get(model_name)])
+
+    def get_optional(self, filepath):
+        """Same as `get`, but return None when the artifact does not exist."""
+        try:
+            return self.get(filepath)
+        except ModelNotFoundError:
+            return None
+
+    def get_models(self):
+        """Return the available trained models keyed by model name."""
+        models = {}
+        for model_name, model_path in Config.MODEL_PATHS.items():
+            model = self.get_optional(model_path)
+            if model is not None:
+                models[model_name] = model
+        return models
+
+    def save(self, artifact, filepath):
+        """Write `artifact` to `filepath` atomically and make it the cached version."""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        # Dump to a temporary file first so readers never unpickle a partial write
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(artifact, tmp_path)
+
+        with self._lock:
+            os.replace(tmp_path, filepath)
+            self._artifacts[filepath] = (self._signature(filepath), artifact)
+
+        return filepath
+
+    def transaction(self):
+        """Hold the registry lock across several reads or writes.
+
+        Writers publish the preprocessor and the models inside one transaction and
+        readers resolve them inside one, so a prediction never pairs a new
+        preprocessor with an old model (or the reverse).
+        """
+        return self._lock
+
+    def invalidate(self, filepath=None):
+        """Drop one cached artifact, or all of them if no path is given."""
+        with self._lock:
+            if filepath is None:
+                self._artifacts.clear()
+            else:
+                self._artifacts.pop(filepath, None)
+
+
+# Shared by every Predictor, pipeline and service in the process
+model_registry = ModelRegistry()
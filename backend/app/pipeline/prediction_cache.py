@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+
+
+class PredictionCache:
+    """Process-wide LRU cache of prediction results, keyed by the cleaned feature values of a row.
+
+    A row is identified by a 64-bit hash of its `Config.FEATURES` values after cleaning (as float64),
+    together with the model name and the version of the preprocessor and model files
+    (`ModelRegistry.model_version`), so a retrain never serves results of the previous models.
+    A cached result takes the NACCID of the row it is served for.
+    Holds at most `Config.PREDICTION_CACHE_MAX_ENTRIES` rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # One LRU of row key -> value per (model name, model version), the least recently used first,
+        # so that the rows of replaced models are the first to go
+        self._namespaces = OrderedDict()
+        self._n_entries = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def row_keys(df_cleaned: pd.DataFrame) -> np.ndarray:
+        """Hash of the feature values of every row of a cleaned frame."""
+        values = df_cleaned[Config.FEATURES].to_numpy(dtype=np.float64, na_value=np.nan)
+        return pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+
+    def get_many(self, model_name, model_version, row_keys):
+        """Cached values of the rows, None for the rows that were not cached."""
+        with self._lock:
+            entries = self._namespaces.get((model_name, model_version))
+            if entries is None:
+                self.misses += len(row_keys)
+                return [None] * len(row_keys)
+
+            self._namespaces.move_to_end((model_name, model_version))
+            get, move_to_end = entries.get, entries.move_to_end
+
+            values = [get(row_key) for row_key in row_keys.tolist()]
+            for row_key, value in zip(row_keys.tolist(), values):
+                if value is not None:
+                    move_to_end(row_key)
+
+            n_misses = values.count(None)
+            self.hits += len(values) - n_misses
+            self.misses += n_misses
+
+        return values
+
+    def put_many(self, model_name, model_version, entries):
+        """Cache the values of rows, given as (row key, value) pairs."""
+        with self._lock:
+            namespace = self._namespaces.setdefault((model_name, model_version), OrderedDict())
+            self._namespaces.move_to_end((model_name, model_version))
+
+            self._n_entries -= len(namespace)
+            namespace.update(entries)
+            self._n_entries += len(namespace)
+
+            while self._n_entries > Config.PREDICTION_CACHE_MAX_ENTRIES:
+                oldest_key, oldest = next(iter(self._namespaces.items()))
+                n_evicted = min(self._n_entries - Config.PREDICTION_CACHE_MAX_ENTRIES, len(oldest))
+                for _ in range(n_evicted):
+                    oldest.popitem(last=False)
+                self._n_entries -= n_evicted
+                if not oldest:
+                    del self._namespaces[oldest_key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": Config.PREDICTION_CACHE_ENABLED,
+                "entries": self._n_entries,
+                "maxEntries": Config.PREDICTION_CACHE_MAX_ENTRIES,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else None
+            }
+
+    def clear(self):
+        with self._lock:
+            self._namespaces.clear()
+            self._n_entries = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every pipeline in the process
+prediction_cache = PredictionCache()
@@ -1,13 +1,72 @@
 from typing import List
 import joblib
 import os
+import numpy as np
 import pandas as pd
 import time
 
 from app.config import Config
 from app.core.exceptions import PredictionError
+from app.pipeline.model_registry import model_registry
 from app.pipeline.preprocessor import DataPreprocessor
-from    app.schemas.results import PredictionResult
+from    app.schemas.results import MultiModelPredictionResult, PredictionResult
+
+# Only included in the results when probabilities are requested
+PROBABILITY_FIELDS = ("probabilities", "confidence")
+PREDICTION_RESULT_FIELDS = tuple(field for field in PredictionResult.model_fields if field not in PROBABILITY_FIELDS)
+MULTI_MODEL_RESULT_FIELDS = tuple(MultiModelPredictionResult.model_fields)
+ENSEMBLE_METHODS = ("hard", "soft")
+
+def _predict_with_proba(model, X):
+    """Class and class probabilities of each row from one predict_proba pass, the class being the most probable one.
+
+    For an SVC, the Platt-scaled probabilities can disagree with predict on rows close to the decision
+    boundary, where the class follows the probabilities so that it matches the confidence.
+    """
+    proba = model.predict_proba(X)
+    return model.classes_[proba.argmax(axis=1)], proba
+
+def _probability_columns(model, predictions, proba):
+    """Probabilities keyed by class and the probability of the predicted class, for every row."""
+    classes = np.asarray(model.classes_)
+    labels = [str(label) for label in classes.astype(np.int64).tolist()]
+
+    # Zipping the class columns is faster than converting the rows one by one
+    probabilities = [dict(zip(labels, row)) for row in zip(*proba.T.tolist())]
+    confidence = proba[np.arange(len(proba)), np.searchsorted(classes, predictions)].tolist()
+
+    return probabilities, confidence
+
+def _hard_vote(predictions):
+    """Majority class of each row, a tie goes to the first model (in the requested order) among the tied ones."""
+    stacked = np.vstack(predictions)
+    classes, codes = np.unique(stacked, return_inverse=True)
+    codes = codes.reshape(stacked.shape)
+
+    rows = np.arange(stacked.shape[1])
+    counts = np.zeros((stacked.shape[1], len(classes)), dtype=np.int64)
+    for model_codes in codes:
+        counts[rows, model_codes] += 1
+    top = counts.max(axis=1)
+
+    # Walk the models from the last one, so that the first tied model has the final say
+    votes = np.empty(stacked.shape[1], dtype=codes.dtype)
+    for model_codes in codes[::-1]:
+        is_top = counts[rows, model_codes] == top
+        votes[is_top] = model_codes[is_top]
+
+    return classes[votes]
+
+def _soft_vote(models, probabilities):
+    """Class of each row with the highest probability averaged over the models."""
+    classes = np.unique(np.concatenate([model.classes_ for model in models]))
+
+    # Models trained on different class sets add their probabilities to the matching columns
+    total = np.zeros((len(probabilities[0]), len(classes)))
+    for model, proba in zip(models, probabilities):
+        total[:, np.searchsorted(classes, model.classes_)] += proba
+
+    return classes[total.argmax(axis=1)]
 
 class Predictor:
 
@@ -17,25 +76,13 @@ class Predictor:
         self.best_model = None
 
     def load_models(self):
-        """Load trained models."""
+        """Load trained models from the shared model registry."""
         try:
-            # Load SVM model
-            if os.path.exists(Config.SVM_MODEL_PATH):
-                self.models["svm"] = joblib.load(Config.SVM_MODEL_PATH)
-                
-            # Load Naive Bayes model
-            if os.path.exists(Config.NB_MODEL_PATH):
-                self.models["naiveBayes"] = joblib.load(Config.NB_MODEL_PATH)
-                
-            # Load Decision Tree model
-            if os.path.exists(Config.DT_MODEL_PATH):
-                self.models["decisionTree"] = joblib.load(Config.DT_MODEL_PATH)
-                
+            self.models = model_registry.get_models()
+
             # Load metrics
-            metrics_path = os.path.join(Config.MODEL_DIR, "model_metrics.pkl")
-            if os.path.exists(metrics_path):
-                self.model_metrics = joblib.load(metrics_path)
-                
+            self.model_metrics = model_registry.get_optional(Config.METRICS_PATH)
+
             return True
             
         except Exception as e:
@@ -51,8 +98,8 @@ class Predictor:
         except Exception as e:
             raise PredictionError(f"Fail to set the best model: {str(e)}")
         
-    def predict_single(self, X):
-        """Predict for a single patient."""
+    def predict_single(self, X, probabilities=False):
+        """Predict for a single patient, with the class probabilities if `probabilities` is set."""
         try:
             # Ensure models are loaded
             if not self.models or not self.best_model_name or not self.best_model_name not in self.models:
@@ -61,22 +108,26 @@ class Predictor:
             if not self.best_model:
                 raise PredictionError(f"Fail to make predictions. The best model is not configured.")
 
-            prediction = self.best_model.predict(X)[0]
+            predictions, probability_columns = self._predict_classes(X, probabilities)
+            prediction = predictions[0]
 
             result: PredictionResult = PredictionResult(
                 NACCID=str(X.index[0]),
                 AGE=int(X["AGE"][0]),
                 SEX=int(X["SEX"][0]),
-                NACCUDSD=int(prediction)
+                NACCUDSD=int(prediction),
+                **({} if probability_columns is None else {
+                    field: column[0] for field, column in zip(PROBABILITY_FIELDS, probability_columns)
+                })
             )
 
-            return result.model_dump()
+            return result.model_dump(exclude=None if probabilities else set(PROBABILITY_FIELDS))
         
         except Exception as e:
             raise PredictionError(f"Error making prediction: {str(e)}")
         
-    def predict_batch(self, X):
-        """Predict from CSV"""
+    def predict_batch(self, X, probabilities=False):
+        """Predict from CSV, with the class probabilities if `probabilities` is set."""
         try:
             # Ensure models are loaded
             if not self.models or not self.best_model_name or not self.best_model_name not in self.models:
@@ -86,23 +137,123 @@ class Predictor:
                 raise PredictionError(f"Fail to make predictions. The best model is not configured.")
 
             # Make predictions
-            predictions = self.best_model.predict(X)
+            predictions, probability_columns = self._predict_classes(X, probabilities)
 
-            results: List[PredictionResult] = []
-            for idx, prediction in enumerate(predictions):
-                result = PredictionResult(
-                    NACCID=str(X.index[idx]),
-                    AGE=int(X["AGE"][idx]),
-                    SEX=int(X['SEX'][idx]),
-                    NACCUDSD=int(prediction)
-                ).model_dump()
-                results.append(result)
-            
-            return results
+            return self.build_results(X, predictions, probability_columns)
 
         except Exception as e:
             raise PredictionError(f"Error making prediction: {str(e)}")
 
+    def _predict_classes(self, X, probabilities=False):
+        """Classes predicted by the best model and, if `probabilities` is set, the probabilities and the
+        confidence of every row from the same pass."""
+        if not probabilities:
+            return self.best_model.predict(X), None
+
+        # An SVC only has predict_proba when trained with Config.SVM_PROBABILITY
+        if not hasattr(self.best_model, "predict_proba"):
+            raise PredictionError(f"Class probabilities are not available, {self.best_model_name} does not provide them.")
+
+        predictions, proba = _predict_with_proba(self.best_model, X)
+        return predictions, _probability_columns(self.best_model, predictions, proba)
+
+    def predict_models(self, X, model_names, ensemble=None):
+        """Predict the same transformed matrix with several models, side by side in threads.
+
+        `model_names` is a list of model names, or "all" for every trained model. With `ensemble` set to
+        "hard" (majority vote) or "soft" (highest mean probability), the ensemble predictions are returned
+        with the predictions of each model, otherwise None.
+        """
+        try:
+            if ensemble not in (None, *ENSEMBLE_METHODS):
+                raise PredictionError(f"Unknown ensemble method '{ensemble}', expected one of: {', '.join(ENSEMBLE_METHODS)}.")
+
+            if not self.models:
+                self.load_models()
+
+            model_names = list(self.models) if model_names == "all" else list(dict.fromkeys(model_names))
+            if not model_names:
+                raise PredictionError("No models selected.")
+
+            unknown = [model_name for model_name in model_names if model_name not in self.models]
+            if unknown:
+                raise PredictionError(f"Unknown or untrained models: {', '.join(unknown)}.")
+
+            models = [self.models[model_name] for model_name in model_names]
+
+            if ensemble == "soft":
+                # An SVC only has predict_proba when trained with Config.SVM_PROBABILITY
+                without_proba = [model_name for model_name, model in zip(model_names, models) if not hasattr(model, "predict_proba")]
+                if without_proba:
+                    raise PredictionError(f"Soft voting needs class probabilities, which {', '.join(without_proba)} does not provide.")
+
+            # The models read the same matrix, threads share it without copies and the
+            # compiled prediction loops of scikit-learn mostly run without the GIL
+            predict = _predict_with_proba if ensemble == "soft" else lambda model, X: model.predict(X)
+            outputs = joblib.Parallel(n_jobs=Config.MULTI_MODEL_N_JOBS, prefer="threads")(
+                joblib.delayed(predict)(model, X) for model in models
+            )
+
+            if ensemble == "soft":
+                predictions = {model_name: classes for model_name, (classes, _) in zip(model_names, outputs)}
+                return predictions, _soft_vote(models, [proba for _, proba in outputs])
+
+            predictions = dict(zip(model_names, outputs))
+            return predictions, _hard_vote(outputs) if ensemble == "hard" else None
+
+        except Exception as e:
+            raise PredictionError(f"Error making prediction: {str(e)}")
+
+    def _result_columns(self, X):
+        """NACCID, AGE and SEX of every row as lists, for building results column-wise."""
+        naccid = X.index.astype(str).to_numpy()
+        age = X["AGE"].to_numpy(dtype=np.float64)
+        sex = X["SEX"].to_numpy(dtype=np.float64)
+
+        if np.isnan(age).any() or np.isnan(sex).any():
+            raise PredictionError("AGE and SEX must be available for every patient.")
+
+        return naccid.tolist(), age.astype(np.int64).tolist(), sex.astype(np.int64).tolist()
+
+    def build_results(self, X, predictions, probability_columns=None):
+        """Build the serialized prediction results column-wise for the whole batch.
+
+        `probability_columns` adds the probabilities and the confidence of every row, see `_predict_classes`.
+        """
+        columns = (
+            *self._result_columns(X),
+            np.asarray(predictions).astype(np.int64).tolist()
+        )
+        fields = PREDICTION_RESULT_FIELDS
+        if probability_columns is not None:
+            columns += tuple(probability_columns)
+            fields += PROBABILITY_FIELDS
+
+        results = [dict(zip(fields, row)) for row in zip(*columns)]
+
+        # Every row has the same types, so the schema only needs to be checked once
+        if results:
+            PredictionResult.model_validate(results[0])
+
+        return results
+
+    def build_model_results(self, X, predictions, ensemble_predictions=None):
+        """Build the serialized results of a multi-model prediction, see `predict_models`."""
+        model_names = list(predictions)
+        model_columns = [np.asarray(model_predictions).astype(np.int64).tolist() for model_predictions in predictions.values()]
+
+        columns = (
+            *self._result_columns(X),
+            [dict(zip(model_names, row)) for row in zip(*model_columns)],
+            [None] * len(X) if ensemble_predictions is None else np.asarray(ensemble_predictions).astype(np.int64).tolist()
+        )
+        results = [dict(zip(MULTI_MODEL_RESULT_FIELDS, row)) for row in zip(*columns)]
+
+        if results:
+            MultiModelPredictionResult.model_validate(results[0])
+
+        return results
+
     def get_prediction_results(self, X):
         """Predict from CSV"""
         try:
@@ -12,6 +12,31 @@ import joblib
 
 from app.config import Config
 from app.core.exceptions import DataValidationError, DataPreprocessingError, ModelNotFoundError
+from app.pipeline.inference_plan import PARITY_CHECK_ROWS, InferencePlan
+from app.pipeline.model_registry import model_registry
+
+CURRENT_YEAR = 2025
+
+# Cleaning rule of each column: codes replaced with NaN and, for numerical features, the range
+# values are clipped to. The valid codes of categorical features are not enforced:
+# SEX 1-2, MOCATRAI 0-1, AMNDEM 0/1/8, NACCPPAG 1-4/7/8, AMYLPET 0-1, DYSILL 0-1, DYSILLIF 1-3/7/8, NACCUDSD 1-4.
+CLEANING_RULES = {
+    "SEX": {"na_values": [99, -4]},  # Only 1=Male, 2=Female are valid
+    "EDUC": {"na_values": [99, -4], "range": (0, 36)},  # 99=Unknown, -4=Not applicable
+    "UDSBENTC": {"na_values": [95, 96, 97, 98, -4], "range": (0, 17)},  # Special codes
+    "MOCATRAI": {"na_values": [95, 96, 97, 98, -4]},  # Special codes
+    "AMNDEM": {"na_values": [-4]},  # -4=Not applicable
+    "NACCPPAG": {"na_values": [-4]},  # -4=Not applicable
+    "AMYLPET": {"na_values": [8, -4]},  # 8=Unknown/not assessed, -4=Not applicable
+    "DYSILL": {"na_values": [-4]},  # -4=Not applicable
+    "DYSILLIF": {"na_values": [-4]},  # -4=Not applicable (keeping 7 and 8 as they are meaningful)
+}
+
+# Rules as arrays, built once at import
+_COMPILED_CLEANING_RULES = {
+    col: (np.array(rule["na_values"]), rule.get("range"))
+    for col, rule in CLEANING_RULES.items()
+}
 
 class DataPreprocessor:
 
@@ -20,6 +45,7 @@ class DataPreprocessor:
         self.cat_features = Config.CATEGORICAL_FEATURES
         self.target = Config.TARGET_COLUMN
         self.preprocessor: ColumnTransformer = None
+        self.inference_plan: InferencePlan = None
 
     def prepare_training_data(self, df, test_size = 0.2):
         """Clean the data and split the dataset into training set and testing set and return them respectively."""
@@ -53,8 +79,9 @@ class DataPreprocessor:
         except Exception as e:
             raise DataPreprocessingError("Error while preparing the prediction data.")
 
-    def fit_transform(self, df):
-        """Fit the preprocessing pipeline to the data and transform it. Please esure the dataset provided has been cleaned, call the `prepare_training_data` to clean the data first."""
+    def fit_transform(self, df, save=True):
+        """Fit the preprocessing pipeline to the data and transform it. Please esure the dataset provided has been cleaned, call the `prepare_training_data` to clean the data first.
+        Pass `save=False` to keep the fitted preprocessor local until `save` is called."""
         try: 
             X = df.drop(columns=[self.target], errors='ignore')
             y = df[self.target] if self.target in df.columns else None
@@ -62,12 +89,14 @@ class DataPreprocessor:
             # Create preprocessing pipeline
             self.preprocessor = self._create_preprocessor(X)
             X_transformed = self.preprocessor.fit_transform(X)
+            self.inference_plan = self._compile_inference_plan(X)
 
             # Convert to DataFrame with column names
             feature_names = self.preprocessor.get_feature_names_out()
             X_processed = pd.DataFrame(X_transformed, index=X.index, columns=feature_names)
 
-            self.save()
+            if save:
+                self.save()
 
             return X_processed, y
         
@@ -92,6 +121,13 @@ class DataPreprocessor:
                 X = df
                 y = None
 
+                if Config.INFERENCE_PLAN_ENABLED and self.inference_plan is not None:
+                    try:
+                        return self.inference_plan.transform(X), y
+                    except Exception as e:
+                        # The ColumnTransformer below reports the problem, if there is one
+                        print(f"Inference plan failed, using the preprocessor: {str(e)}")
+
             X_transformed = self.preprocessor.transform(X)
 
             # Convert to Dataframe
@@ -105,14 +141,21 @@ class DataPreprocessor:
             raise DataPreprocessingError("Error while 'transform' the dataset.")
     
     def load(self, filepath=None):
-        """Load the preprocessor."""
+        """Load the preprocessor, and the inference plan exported with it, from the shared model registry."""
         if filepath is None:
-            filepath = os.path.join(Config.MODEL_DIR, "preprocessor.pkl")
+            filepath = Config.PREPROCESSOR_PATH
 
-        if not os.path.exists(filepath):
+        try:
+            self.preprocessor = model_registry.get(filepath)
+        except ModelNotFoundError:
             raise ModelNotFoundError(f"Preprocessor file not found.")
-        
-        self.preprocessor = joblib.load(filepath)
+
+        # Preprocessors saved without a plan (or with one that could not be compiled) use the ColumnTransformer
+        inference_plan = model_registry.get_optional(self.inference_plan_path(filepath))
+        if inference_plan is not None and not inference_plan.matches(self.preprocessor):
+            inference_plan = None
+        self.inference_plan = inference_plan
+
         return self.preprocessor
     
     def save(self, filepath=None):
@@ -121,15 +164,85 @@ class DataPreprocessor:
             raise DataPreprocessingError("Preprocessor must be fitted before it can be saved.")
         
         if filepath is None:
-            filepath = os.path.join(Config.MODEL_DIR, "preprocessor.pkl")
+            filepath = Config.PREPROCESSOR_PATH
 
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        joblib.dump(self.preprocessor, filepath)
-        return filepath
+        # Written atomically, and replaces the cached version for every consumer.
+        # The plan is always rewritten, so that a plan of a previous preprocessor is never paired with this one
+        model_registry.save(self.inference_plan, self.inference_plan_path(filepath))
+        return model_registry.save(self.preprocessor, filepath)
+
+    @staticmethod
+    def inference_plan_path(filepath):
+        """Path of the inference plan exported with the preprocessor saved at `filepath`."""
+        if os.path.abspath(filepath) == os.path.abspath(Config.PREPROCESSOR_PATH):
+            return Config.INFERENCE_PLAN_PATH
+
+        root, extension = os.path.splitext(filepath)
+        return f"{root}_inference_plan{extension or '.pkl'}"
+
+    def _compile_inference_plan(self, X):
+        """Compile the fitted preprocessor to an `InferencePlan` and check it against the preprocessor on
+        the first rows of the training data. Returns None when the preprocessor cannot be compiled."""
+        try:
+            inference_plan = InferencePlan.compile(self.preprocessor)
+            inference_plan.check_parity(self.preprocessor, X.iloc[:PARITY_CHECK_ROWS])
+            return inference_plan
+
+        except Exception as e:
+            print(f"Inference plan not exported: {str(e)}")
+            return None
     
 
+    def validate_records(self, records):
+        """Validate single-patient records (dicts, as sent to the prediction endpoints) one by one.
+
+        A record is invalid if it is not a dict, misses a feature (AGE can be replaced by BIRTHYR) or has a
+        non-numeric feature value. Returns the frame of the valid records with their feature values as numbers,
+        the positions of these records in `records` and the error message of every invalid record by position.
+        """
+        errors = {}
+        valid_records, positions, has_age = [], [], []
+
+        for position, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[position] = "Patient record must be a JSON object."
+                continue
+
+            missing_columns = [
+                col for col in Config.FEATURES
+                if col not in record and not (col == "AGE" and "BIRTHYR" in record)
+            ]
+            if missing_columns:
+                errors[position] = f"Missing required columns: {', '.join(missing_columns)}"
+                continue
+
+            valid_records.append(record)
+            positions.append(position)
+            has_age.append("AGE" in record)
+
+        df = pd.DataFrame(valid_records)
+        positions = np.array(positions, dtype=np.int64)
+
+        # Numbers (or numeric strings) and nulls are accepted, anything else invalidates the record
+        numeric_columns = [col for col in [*Config.FEATURES, "BIRTHYR"] if col in df.columns]
+        non_numeric = np.zeros((len(df), len(numeric_columns)), dtype=bool)
+        for i, col in enumerate(numeric_columns):
+            values = pd.to_numeric(df[col], errors="coerce")
+            non_numeric[:, i] = (values.isna() & df[col].notna()).to_numpy()
+            df[col] = values
+
+        # Records without AGE get it from their birth year, as a single record would in `_clean_data`
+        if "BIRTHYR" in df.columns and not all(has_age):
+            age_from_birth_year = CURRENT_YEAR - df["BIRTHYR"]
+            df["AGE"] = df["AGE"].where(np.array(has_age), age_from_birth_year) if "AGE" in df.columns else age_from_birth_year
+
+        invalid_rows = non_numeric.any(axis=1)
+        for row in np.flatnonzero(invalid_rows):
+            columns = [col for col, invalid in zip(numeric_columns, non_numeric[row]) if invalid]
+            errors[int(positions[row])] = f"Non-numeric values for: {', '.join(columns)}"
+
+        return df[~invalid_rows], positions[~invalid_rows], errors
+
     def _validate_data(self, df: pd.DataFrame, for_training=False):
         """Validate that the data has all required columns and format."""
         # Check that dataframe is not empty
@@ -151,100 +264,73 @@ class DataPreprocessor:
         if missing_columns:
             raise DataValidationError(f"Missing required columns: {', '.join(missing_columns)}")
 
-    def _calculate_age(self, df):
-        """Calculate the age from the birth year."""
-        df = df.copy()
+    def _clean_data(self, df, for_training):
+        """Clean the data.
+
+        Selects the feature columns first, then applies `CLEANING_RULES` to each of them with NumPy masks.
+        The input frame is not modified and the selected columns are copied only once, into the result.
+        """
+        try:
+            if for_training:
+                selected_columns = Config.FEATURES_WITH_TARGET
+            else:
+                selected_columns = Config.FEATURES
+
+            columns = {}
+            for col in selected_columns:
+                if col in df.columns:
+                    values = self._column_values(df[col])
+                elif col == "AGE" and "BIRTHYR" in df.columns:
+                    # Calculate the age from the birth year
+                    values = CURRENT_YEAR - self._column_values(df["BIRTHYR"])
+                else:
+                    continue
+
+                columns[col] = self._apply_cleaning_rule(col, values)
 
-        if "BIRTHYR" not in df.columns:
-            raise DataValidationError("Cannot calculate age: 'BIRTHYR' column is missing.")
+            return pd.DataFrame(columns, index=df.index)
         
-        current_year = 2025
-        df["AGE"] = current_year - df["BIRTHYR"]
+        except Exception as e:
+            raise DataValidationError(f"Data cleaning failed: {str(e)}")
 
-        return df
-    
-    def _replace_invalid_values_with_na(self, df):
-        """Clean the data by replacing invalid values with NaN"""
-        df = df.copy()
-
-        replace_na = {
-            "SEX": [99, -4],  # Only 1=Male, 2=Female are valid
-            "EDUC": [99, -4],  # 99=Unknown, -4=Not applicable
-            "UDSBENTC": [95, 96, 97, 98, -4],  # Special codes
-            "MOCATRAI": [95, 96, 97, 98, -4],  # Special codes
-            "AMNDEM": [-4],  # -4=Not applicable
-            "NACCPPAG": [-4],  # -4=Not applicable
-            "AMYLPET": [8, -4],  # 8=Unknown/not assessed, -4=Not applicable
-            "DYSILL": [-4],  # -4=Not applicable
-            "DYSILLIF": [-4],  # -4=Not applicable (keeping 7 and 8 as they are meaningful)
-        }
-
-        for col, invalid_vals in replace_na.items():
-            if col in df.columns:
-                df[col] = df[col].replace(invalid_vals, np.nan)
-
-        return df
-    
-    def _validate_data_ranges(self, df):
-        """Validate values are within expected ranges."""
-        validation_ranges = {
-            "SEX": [1, 2],
-            "EDUC": list(range(0, 37)),  # 0-36
-            "UDSBENTC": list(range(0, 18)),  # 0-17
-            "MOCATRAI": [0, 1],
-            "AMNDEM": [0, 1, 8],  # Including 8 as valid
-            "NACCPPAG": [1, 2, 3, 4, 7, 8],
-            "AMYLPET": [0, 1],
-            "DYSILL": [0, 1],
-            "DYSILLIF": [1, 2, 3, 7, 8],  # Including 7, 8 as valid
-            "NACCUDSD": [1, 2, 3, 4]
-        }
-
-        for col, allowed_values in validation_ranges.items():
-            if col in df.columns:
-                if len(allowed_values) > 10:  # Continuous range
-                    min_val, max_val = min(allowed_values), max(allowed_values)
-                    invalid_mask = (df[col] < min_val) | (df[col] > max_val)
-                    if invalid_mask.any():
-                        df.loc[invalid_mask, col] = df.loc[invalid_mask, col].clip(min_val, max_val)
-                # else:  # Categorical
-                    # invalid_mask = ~df[col].isin(allowed_values)
-                    # print("CATEgorical=", invalid_mask)
-                    # if invalid_mask.any():
-                    #     mode_value = df.loc[~invalid_mask, col].mode(dropna=True)[0]
-                    #     df.loc[invalid_mask, col] = mode_value
-
-        return df
-    
-    def _select_features(self, df, for_training):
-        """Select relevant features for Alzheimer's prediction."""
-        if for_training:
-            selected_columns = Config.FEATURES_WITH_TARGET
-        else:
-            selected_columns = Config.FEATURES
+    def _column_values(self, series):
+        """NumPy values of a column. Nullable integer columns (see `app.pipeline.reader`) keep their small
+        integer dtype when complete, and become float32 with NaN for missing values otherwise."""
+        if not isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            return series.to_numpy()
 
-        available_columns = [col for col in selected_columns if col in df.columns]
-        return df[available_columns].copy()
+        if series.hasnans:
+            return series.to_numpy(dtype=np.float32, na_value=np.nan)
+        return series.to_numpy(dtype=series.dtype.numpy_dtype)
 
-    def _clean_data(self, df, for_training):
-        """Clean the data"""
-        try:
-            # 1. Calculate age
-            if "AGE" not in df.columns and "BIRTHYR" in df.columns:
-                df = self._calculate_age(df)
+    def _apply_cleaning_rule(self, col, values):
+        """Replace the invalid codes of a column with NaN and clip it to its valid range.
 
-            # 2. Replace invalid values
-            df = self._replace_invalid_values_with_na(df)
+        Returns `values` itself when nothing changes, otherwise a new array.
+        """
+        rule = _COMPILED_CLEANING_RULES.get(col)
+        if rule is None:
+            return values
 
-            # 3. Validate data ranges
-            df = self._validate_data_ranges(df)
+        na_values, value_range = rule
 
-            # 4. Feature selection
-            df = self._select_features(df, for_training)
-            return df
-        
-        except Exception as e:
-            raise DataValidationError(f"Data cleaning failed: {str(e)}")
+        invalid_mask = np.isin(values, na_values)
+        if invalid_mask.any():
+            if values.dtype.kind in "iub":
+                # Small integer codes only need float32 to hold NaN
+                values = values.astype(np.result_type(values.dtype, np.float32))
+            else:
+                values = values.copy()
+            values[invalid_mask] = np.nan
+
+        if value_range is not None:
+            min_val, max_val = value_range
+            with np.errstate(invalid="ignore"):
+                out_of_range = (values < min_val) | (values > max_val)
+            if out_of_range.any():
+                values = np.clip(values, min_val, max_val)
+
+        return values
 
     
     def _create_preprocessor(self, X):
@@ -0,0 +1,268 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.core.exceptions import DataValidationError
+
+# Columns read from an upload, the rest of the NACC export is skipped by the parser
+INGESTION_COLUMNS = frozenset(["NACCID", "BIRTHYR", *Config.FEATURES_WITH_TARGET])
+
+# Numeric columns are parsed as float32, which holds every code and score exactly and cannot
+# overflow. Small integer codes are narrowed afterwards to these nullable integer dtypes.
+FLOAT_COLUMNS = ["AGE", "EDUC", "UDSBENTC"]
+INTEGER_COLUMNS = {
+    "BIRTHYR": "Int16",
+    "SEX": "Int8",
+    "MOCATRAI": "Int8",
+    "AMNDEM": "Int8",
+    "NACCPPAG": "Int8",
+    "AMYLPET": "Int8",
+    "DYSILL": "Int8",
+    "DYSILLIF": "Int8",
+    "NACCUDSD": "Int8",
+}
+PARSE_DTYPES = {col: "float32" for col in [*FLOAT_COLUMNS, *INTEGER_COLUMNS]}
+
+# Binary upload formats, recognised by extension or by the magic bytes at the start of the file
+UPLOAD_FORMAT_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow", "feather": "arrow"}
+UPLOAD_FORMAT_NAMES = {"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow"}
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+
+def _read_options(compact):
+    options = {"skiprows": 1, "usecols": lambda col: col in INGESTION_COLUMNS}
+    if compact:
+        options["dtype"] = PARSE_DTYPES
+    return options
+
+
+def _narrow_integer_column(values: pd.Series, dtype: str) -> pd.Series:
+    """Convert a float32 column of integer codes to a nullable small integer column.
+
+    The column is left as float32 if any value is fractional or out of the range of `dtype`.
+    """
+    array = values.to_numpy()
+    missing = np.isnan(array)
+    present = array[~missing]
+
+    info = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+    if len(present) and (present.min() < info.min or present.max() > info.max or (present != np.round(present)).any()):
+        return values
+
+    integers = np.where(missing, 0, array).astype(info.dtype)
+    return pd.Series(pd.arrays.IntegerArray(integers, missing), index=values.index, name=values.name)
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns:
+            df[col] = _narrow_integer_column(df[col], dtype)
+    return df
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+        return True
+    return isinstance(source, str)
+
+
+def upload_format(content, filename: str = None) -> str:
+    """Format of an upload: "csv", "parquet" or "arrow" (Arrow IPC file or stream, a.k.a. Feather v2).
+
+    The file extension decides when it is one of `Config.ALLOWED_EXTENSIONS`, otherwise the magic
+    bytes at the start of `content` (bytes, or a seekable file left at its start) do. Anything else is read as CSV.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else None
+    if extension in Config.ALLOWED_EXTENSIONS:
+        return UPLOAD_FORMAT_EXTENSIONS.get(extension, "csv")
+
+    if hasattr(content, "read"):
+        stream, content = content, content.read(len(ARROW_FILE_MAGIC))
+        stream.seek(0)
+
+    if content.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if content.startswith(ARROW_FILE_MAGIC) or content.startswith(ARROW_STREAM_MAGIC):
+        return "arrow"
+    return "csv"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise DataValidationError("Parquet and Arrow uploads require the pyarrow package, please upload a CSV file.")
+    return pyarrow
+
+
+def _arrow_input(pa, source):
+    """Wrap a path, bytes or file object so that pyarrow reads it without copying where possible."""
+    if isinstance(source, str):
+        return pa.memory_map(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pa.BufferReader(source)
+    if isinstance(source, io.BytesIO):
+        return pa.BufferReader(source.getbuffer())
+    return pa.PythonFile(source, mode="r")
+
+
+def _projected_columns(names):
+    return [col for col in names if col in INGESTION_COLUMNS]
+
+
+def _open_arrow_upload(pa, source, file_format):
+    """Open a Parquet or Arrow IPC upload.
+
+    Returns the `ParquetFile`, whose columns are projected when it is read, or the IPC table
+    already restricted to `INGESTION_COLUMNS`.
+    """
+    arrow_input = _arrow_input(pa, source)
+    if arrow_input.size() == 0:
+        # Same error as an empty CSV, so the callers report it the same way
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+
+    if file_format == "parquet":
+        return pa.parquet.ParquetFile(arrow_input)
+
+    magic = arrow_input.read(len(ARROW_FILE_MAGIC))
+    arrow_input.seek(0)
+    if magic == ARROW_FILE_MAGIC:
+        table = pa.ipc.open_file(arrow_input).read_all()
+    else:
+        table = pa.ipc.open_stream(arrow_input).read_all()
+
+    # Selecting columns references the buffers already read, without copying them
+    return table.select(_projected_columns(table.column_names))
+
+
+def _compact_table(pa, table):
+    """Cast an Arrow table to the compact schema: float32 numerics and small integer codes.
+
+    A code column that does not fit its integer type (fractional or out of range values) is cast
+    to float32 instead, one that is not numeric at all is left as is.
+    """
+    for i, col in enumerate(table.column_names):
+        if col in FLOAT_COLUMNS:
+            targets = [(pa.float32(), False)]
+        elif col in INTEGER_COLUMNS:
+            integer_type = pa.from_numpy_dtype(pd.api.types.pandas_dtype(INTEGER_COLUMNS[col]).numpy_dtype)
+            # A safe cast fails on overflow and on truncated fractions instead of wrapping
+            targets = [(integer_type, True), (pa.float32(), False)]
+        else:
+            continue
+
+        for target_type, safe in targets:
+            try:
+                table = table.set_column(i, col, pa.compute.cast(table.column(i), target_type, safe=safe))
+                break
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                continue
+
+    return table
+
+
+def _arrow_to_frame(pa, table):
+    if not Config.COMPACT_INGESTION:
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    nullable_dtypes = {
+        pa.from_numpy_dtype(pd.api.types.pandas_dtype(dtype).numpy_dtype): pd.api.types.pandas_dtype(dtype)
+        for dtype in set(INTEGER_COLUMNS.values())
+    }
+    return _compact_table(pa, table).to_pandas(split_blocks=True, self_destruct=True, types_mapper=nullable_dtypes.get)
+
+
+def _read_arrow_upload(source, file_format):
+    pa = _import_pyarrow()
+    try:
+        upload = _open_arrow_upload(pa, source, file_format)
+        if file_format == "parquet":
+            upload = upload.read(columns=_projected_columns(upload.schema_arrow.names))
+    except (pa.ArrowInvalid, OSError) as e:
+        raise DataValidationError(f"Invalid {UPLOAD_FORMAT_NAMES[file_format]} file: {str(e)}")
+
+    return _arrow_to_frame(pa, upload)
+
+
+def _iter_arrow_upload(source, file_format, chunk_size):
+    pa = _import_pyarrow()
+    try:
+        upload = _open_arrow_upload(pa, source, file_format)
+        if file_format == "parquet":
+            batches = upload.iter_batches(batch_size=chunk_size, columns=_projected_columns(upload.schema_arrow.names))
+        else:
+            batches = upload.to_batches(max_chunksize=chunk_size)
+
+        for batch in batches:
+            yield _arrow_to_frame(pa, pa.Table.from_batches([batch]))
+
+    except (pa.ArrowInvalid, OSError) as e:
+        raise DataValidationError(f"Invalid {UPLOAD_FORMAT_NAMES[file_format]} file: {str(e)}")
+
+
+def read_upload(source, file_format="csv") -> pd.DataFrame:
+    """Read an uploaded NACC extract: a CSV with one line before the header, or a Parquet or Arrow IPC file.
+
+    Only `INGESTION_COLUMNS` are parsed and, with `Config.COMPACT_INGESTION`, with compact dtypes.
+    CSV files that do not fit the compact schema (e.g. text in a numeric column) are read again with
+    pandas defaults, so they fail or succeed further down the pipeline exactly as before.
+    Parquet and Arrow columns are projected and cast by pyarrow, numeric columns without missing
+    values are handed to pandas without a copy.
+    """
+    if file_format != "csv":
+        return _read_arrow_upload(source, file_format)
+
+    if not Config.COMPACT_INGESTION:
+        return pd.read_csv(source, **_read_options(compact=False))
+
+    try:
+        return _compact(pd.read_csv(source, **_read_options(compact=True)))
+    except pd.errors.EmptyDataError:
+        raise
+    except (ValueError, TypeError) as e:
+        if not _rewind(source):
+            raise
+
+        print(f"Compact read failed, reading with default dtypes: {str(e)}")
+        return pd.read_csv(source, **_read_options(compact=False))
+
+
+def iter_upload_chunks(source, chunk_size, file_format="csv"):
+    """Read an uploaded NACC extract in chunks of rows, with the same columns and dtypes as `read_upload`.
+
+    For CSV, the default dtypes are only used as a fallback when the first chunk does not fit the compact schema.
+    """
+    if file_format != "csv":
+        yield from _iter_arrow_upload(source, file_format, chunk_size)
+        return
+
+    compact = Config.COMPACT_INGESTION
+
+    try:
+        reader = pd.read_csv(source, chunksize=chunk_size, **_read_options(compact))
+        first_chunk = next(reader, None)
+    except pd.errors.EmptyDataError:
+        raise
+    except (ValueError, TypeError) as e:
+        if not compact or not _rewind(source):
+            raise
+
+        print(f"Compact read failed, reading with default dtypes: {str(e)}")
+        compact = False
+        reader = pd.read_csv(source, chunksize=chunk_size, **_read_options(compact))
+        first_chunk = next(reader, None)
+
+    if first_chunk is None:
+        return
+
+    yield _compact(first_chunk) if compact else first_chunk
+    for chunk in reader:
+        yield _compact(chunk) if compact else chunk
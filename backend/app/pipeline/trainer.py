@@ -3,14 +3,50 @@ import os
 import time
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import StratifiedKFold, GridSearchCV
-from sklearn.svm import SVC
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import StratifiedKFold, GridSearchCV, HalvingRandomSearchCV, ParameterGrid, RandomizedSearchCV
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC, LinearSVC
 from sklearn.naive_bayes import GaussianNB
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 
 from app.config import Config
-from app.core.exceptions import ModelTrainingError
+from app.core.exceptions import ConfigurationError, ModelTrainingError
+from app.pipeline.model_registry import model_registry
+
+def _fit_model(model_name, model, X_train, y_train):
+    """Fit a single model and time it. Runs in a joblib worker when training in parallel."""
+    try:
+        start_time = time.perf_counter()
+        model.fit(X_train, y_train)
+        return model_name, model, time.perf_counter() - start_time
+
+    except Exception as e:
+        print("ERROR=", str(e))
+        raise ModelTrainingError(f"Error training {model_name}: {str(e)}")
+
+def _evaluate_model(model_name, model, X_test, y_test):
+    """Compute the test metrics of a single model and time the evaluation."""
+    try:
+        start_time = time.perf_counter()
+        y_pred = model.predict(X_test)
+        # Calculate metrics
+        metrics = {
+            "accuracy": accuracy_score(y_test, y_pred),
+            "precision": precision_score(y_test, y_pred, average="weighted", zero_division=0),
+            "recall": recall_score(y_test, y_pred, average="weighted", zero_division=0),
+            "f1Score": f1_score(y_test, y_pred, average="weighted", zero_division=0)
+        }
+        metrics["evaluationTime"] = time.perf_counter() - start_time
+
+        return model_name, metrics
+
+    except Exception as e:
+        raise ModelTrainingError(f"Error evaluating {model_name}: {str(e)}")
 
 class ModelTrainer:
 
@@ -21,7 +57,7 @@ class ModelTrainer:
         #     "decisionTree": DecisionTreeClassifier(random_state=Config.RANDOM_STATE)
         # }
         self.models = {
-            "svm": SVC(probability=True, C=1.0, kernel='rbf', gamma=0.1, random_state=Config.RANDOM_STATE),
+            "svm": SVC(probability=Config.SVM_PROBABILITY, C=1.0, kernel='rbf', gamma=0.1, random_state=Config.RANDOM_STATE),
             "naiveBayes": GaussianNB(),
             "decisionTree": DecisionTreeClassifier(max_depth=5, min_samples_split=5, random_state=Config.RANDOM_STATE)
         }
@@ -42,60 +78,169 @@ class ModelTrainer:
                 'min_samples_leaf': [1, 2, 5, 10]
             }
         }
+
+        # Grid used instead of "svm" when the approximate-kernel SVM is trained
+        self.approximate_svm_param_grid = {
+            'kernel_map__gamma': [0.001, 0.01, 0.1, 1],
+            'classifier__C': [0.1, 1, 10, 50]
+        }
         
         self.best_estimators = {}
         self.cv_results = {}
         self.model_metrics = {}
+        self.training_times = {}
         self.best_model_name = None
         self.best_model = None
 
-    def train_models(self, X_train, y_train):
-        """Train and tune models using grid search cross-validation."""
-        # cv = StratifiedKFold(n_splits=Config.CV_SPLITS, shuffle=True, random_state=Config.RANDOM_STATE)
+    def _create_approximate_svm(self):
+        """RBF kernel approximated by an explicit feature map followed by a linear SVM."""
+        if Config.SVM_KERNEL_APPROXIMATION == "nystroem":
+            kernel_map = Nystroem(kernel="rbf", gamma=0.1, n_components=Config.SVM_APPROX_COMPONENTS, random_state=Config.RANDOM_STATE)
+        elif Config.SVM_KERNEL_APPROXIMATION == "rff":
+            kernel_map = RBFSampler(gamma=0.1, n_components=Config.SVM_APPROX_COMPONENTS, random_state=Config.RANDOM_STATE)
+        else:
+            raise ConfigurationError(f"Unknown SVM kernel approximation: {Config.SVM_KERNEL_APPROXIMATION}")
 
-        # for model_name, model in self.models.items():
-        #     try:
-        #         grid_search = GridSearchCV(
-        #             model,
-        #             param_grid=self.param_grids[model_name],
-        #             cv=cv,
-        #             scoring="f1_weighted",
-        #             n_jobs=-1,
-        #             verbose=1
-        #         )
-
-        #         # Fit grid search
-        #         start_time = time.time()
-        #         grid_search.fit(X_train, y_train)
-        #         end_time = time.time()
-
-        #         # Store best models
-        #         self.best_estimators[model_name] = grid_search.best_estimator_
-
-        #         # Store cv results
-        #         self.cv_results[model_name] = {
-        #             "training_time": end_time - start_time,
-        #             "best_params": grid_search.best_params_,
-        #             "best_f1_weighted_cv_train": grid_search.best_score_
-        #         }
+        classifier = LinearSVC(C=1.0, random_state=Config.RANDOM_STATE)
+        if Config.SVM_PROBABILITY:
+            classifier = CalibratedClassifierCV(classifier, cv=Config.CV_SPLITS)
 
-        #         print(f"Best F1-score (weighted):for {model_name} (on train CV): {grid_search.best_score_:.4f}")
-        #         print(f"Best parameters for {model_name}: {grid_search.best_params_}")
-                
-        #     except Exception as e:
-        #         raise ModelTrainingError(f"Error training {model_name}: {str(e)}")
+        return Pipeline(steps=[
+            ("kernel_map", kernel_map),
+            ("classifier", classifier)
+        ])
+
+    def _use_approximate_svm(self, X_train):
+        return Config.SVM_KERNEL_APPROXIMATION is not None and len(X_train) >= Config.SVM_APPROX_MIN_SAMPLES
+
+    def _get_param_grid(self, model_name):
+        if model_name == "svm" and isinstance(self.models["svm"], Pipeline):
+            param_grid = dict(self.approximate_svm_param_grid)
+            if isinstance(self.models["svm"].named_steps["classifier"], CalibratedClassifierCV):
+                param_grid["classifier__estimator__C"] = param_grid.pop("classifier__C")
+            return param_grid
+
+        return self.param_grids[model_name]
+
+    def tune_models(self, X_train, y_train):
+        """Tune models with a budgeted hyperparameter search over `param_grids`.
+
+        Successive halving (or a randomized search) samples at most `Config.TUNING_MAX_CANDIDATES`
+        candidates per model and evaluates them on `Config.CV_SPLITS` folds in parallel.
+
+        `Config.TUNING_TIME_BUDGET` is shared by the models still to tune. Each model is first fitted
+        once with its default parameters, and its search gets only as many candidates as that fit time
+        says fit in its share. A model without time for a single candidate keeps this default fit.
+        The budget is an estimate rather than a hard limit: candidates much slower to fit than the
+        default parameters can still overrun it.
+        """
+        cv = StratifiedKFold(n_splits=Config.CV_SPLITS, shuffle=True, random_state=Config.RANDOM_STATE)
+        tuning_start = time.perf_counter()
+        n_workers = joblib.effective_n_jobs(Config.TUNING_N_JOBS)
+
+        model_names = list(self.models)
+        for position, model_name in enumerate(model_names):
+            model = self.models[model_name]
+            remaining = Config.TUNING_TIME_BUDGET - (time.perf_counter() - tuning_start)
+            if remaining <= 0:
+                print(f"Tuning budget exhausted, keeping default parameters for {model_name}.")
+                self.cv_results[model_name] = {"status": "skipped"}
+                continue
 
-        for model_name, model in self.models.items():
             try:
-                model.fit(X_train, y_train)
+                param_grid = self._get_param_grid(model_name)
 
-            except Exception as e:
+                # Time one fit with the default parameters on the whole training set. Each candidate costs at
+                # most CV_SPLITS such fits on smaller folds; successive halving fits most candidates on fewer
+                # samples still, so it never costs more than a randomized search of the same candidates.
+                _, default_model, default_fit_time = _fit_model(model_name, clone(model), X_train, y_train)
+                share = (remaining - default_fit_time) / (len(model_names) - position)
+                candidate_time = default_fit_time * Config.CV_SPLITS / n_workers
+                affordable = int(share // candidate_time) if candidate_time > 0 else Config.TUNING_MAX_CANDIDATES
+                n_candidates = min(Config.TUNING_MAX_CANDIDATES, len(ParameterGrid(param_grid)), affordable)
+
+                if n_candidates < 1:
+                    print(f"Tuning budget too small for {model_name}, keeping default parameters.")
+                    # Already fitted, `train_models` does not fit it again
+                    self.best_estimators[model_name] = default_model
+                    self.models[model_name] = default_model
+                    self.training_times[model_name] = default_fit_time
+                    self.cv_results[model_name] = {"status": "skipped"}
+                    continue
+
+                if Config.TUNING_STRATEGY == "halving":
+                    search = HalvingRandomSearchCV(
+                        model,
+                        param_distributions=param_grid,
+                        n_candidates=n_candidates,
+                        factor=3,
+                        cv=cv,
+                        scoring="f1_weighted",
+                        random_state=Config.RANDOM_STATE,
+                        n_jobs=Config.TUNING_N_JOBS
+                    )
+                else:
+                    search = RandomizedSearchCV(
+                        model,
+                        param_distributions=param_grid,
+                        n_iter=n_candidates,
+                        cv=cv,
+                        scoring="f1_weighted",
+                        random_state=Config.RANDOM_STATE,
+                        n_jobs=Config.TUNING_N_JOBS
+                    )
+
+                # Fit the search, the best candidate is refitted on the whole training set
+                start_time = time.perf_counter()
+                search.fit(X_train, y_train)
+                end_time = time.perf_counter()
+
+                # Store best models
+                self.best_estimators[model_name] = search.best_estimator_
+                self.models[model_name] = search.best_estimator_
+                self.training_times[model_name] = end_time - start_time
+
+                # Store cv results
+                self.cv_results[model_name] = {
+                    "status": "tuned",
+                    "strategy": Config.TUNING_STRATEGY,
+                    "training_time": end_time - start_time,
+                    "n_candidates": n_candidates,
+                    "n_evaluations": len(search.cv_results_["params"]),
+                    "best_params": {k: (v.item() if isinstance(v, np.generic) else v) for k, v in search.best_params_.items()},
+                    "best_f1_weighted_cv_train": float(search.best_score_)
+                }
+
+                print(f"Best F1-score (weighted):for {model_name} (on train CV): {search.best_score_:.4f}")
+                print(f"Best parameters for {model_name}: {search.best_params_}")
                 
-                print("ERROR=", str(e))
-                raise ModelTrainingError(f"Error training {model_name}: {str(e)}")
+            except Exception as e:
+                raise ModelTrainingError(f"Error tuning {model_name}: {str(e)}")
+
+    def train_models(self, X_train, y_train):
+        """Train the models, tuning them first when `Config.TUNING_ENABLED` is set."""
+        # Exact kernel SVM training grows quadratically with the samples, large sets use the approximation
+        if self._use_approximate_svm(X_train):
+            self.models["svm"] = self._create_approximate_svm()
+
+        if Config.TUNING_ENABLED:
+            self.tune_models(X_train, y_train)
 
-    def evaluate_models(self, X_test, y_test):
-        """Evaluate all trained models on test data."""
+        # Tuned models were already refitted by their search
+        untrained_models = {name: model for name, model in self.models.items() if name not in self.best_estimators}
+
+        # Each candidate is fitted independently, so they can run side by side in worker processes
+        fitted = joblib.Parallel(n_jobs=Config.TRAINING_N_JOBS)(
+            joblib.delayed(_fit_model)(model_name, model, X_train, y_train)
+            for model_name, model in untrained_models.items()
+        )
+
+        for model_name, model, training_time in fitted:
+            self.models[model_name] = model
+            self.training_times[model_name] = training_time
+
+    def evaluate_models(self, X_test, y_test, save=True):
+        """Evaluate all trained models on test data. Pass `save=False` to publish the models later with `save_models`."""
         # if not self.best_estimators:
         #     raise ModelTrainingError("No trained models found. Train models first.")
         
@@ -117,26 +262,20 @@ class ModelTrainer:
         #     except Exception as e:
         #         raise ModelTrainingError(f"Error evaluating {model_name}: {str(e)}")
 
-        for model_name, model in self.models.items():
-            try:
-                y_pred = model.predict(X_test)
-                # Calculate metrics
-                metrics = {
-                    "accuracy": accuracy_score(y_test, y_pred),
-                    "precision": precision_score(y_test, y_pred, average="weighted", zero_division=0),
-                    "recall": recall_score(y_test, y_pred, average="weighted", zero_division=0),
-                    "f1Score": f1_score(y_test, y_pred, average="weighted", zero_division=0)
-                }
-
-                self.model_metrics[model_name] = metrics
+        evaluated = joblib.Parallel(n_jobs=Config.TRAINING_N_JOBS)(
+            joblib.delayed(_evaluate_model)(model_name, model, X_test, y_test)
+            for model_name, model in self.models.items()
+        )
 
-            except Exception as e:
-                raise ModelTrainingError(f"Error evaluating {model_name}: {str(e)}")
+        for model_name, metrics in evaluated:
+            metrics["trainingTime"] = self.training_times.get(model_name)
+            self.model_metrics[model_name] = metrics
             
         self.best_model_name = max(self.model_metrics, key=lambda k: self.model_metrics[k]['f1Score'])
         self.best_model = self.models[self.best_model_name]
 
-        self.save_models()
+        if save:
+            self.save_models()
 
         return self.model_metrics
     
@@ -157,19 +296,17 @@ class ModelTrainer:
         # Save each model
         # for model_name, model in self.best_estimators.items():
         for model_name, model in self.models.items():
-            model_path = None
-
-            if model_name == "svm": 
-                model_path = Config.SVM_MODEL_PATH
-            elif model_name == "naiveBayes":
-                model_path = Config.NB_MODEL_PATH
-            elif model_name == "decisionTree":
-                model_path = Config.DT_MODEL_PATH
+            model_path = Config.MODEL_PATHS.get(model_name)
 
             if model_path:
-                joblib.dump(model, model_path)
+                model_registry.save(model, model_path)
+
+        # Keep the best parameters and search timings next to the tuned models. Always rewritten,
+        # so that the results of a previous run are never left next to models trained without tuning
+        model_registry.save(self.cv_results or None, Config.TUNING_RESULTS_PATH)
             
         return {
             "best_model": self.best_model_name,
-            "models": self.model_metrics
+            "models": self.model_metrics,
+            "tuning": self.cv_results
         }
\ No newline at end of file
@@ -1,13 +1,18 @@
 from typing import List
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 import pandas as pd
 import io
+import json
 
+from app.config import Config
 from app.core.exceptions import ModelTrainingError, DataValidationError, PredictionError
+from app.pipeline import upload_format
 from app.services.prediction_service import PredictionService
 
 prediction_bp = Blueprint('prediction', __name__)
 
+NDJSON_MIMETYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
 # Create services
 prediction_service = PredictionService()
 
@@ -23,13 +28,18 @@ def train_models():
         file = request.files["file"]
 
         try:
-            filepath = io.StringIO(file.read().decode('utf-8'))
-            train_results = prediction_service.train_models(filepath)
+            content = file.read()
+            file_format = upload_format(content, file.filename)
+            if file_format == "csv":
+                content = content.decode('utf-8')
+
+            # Training runs in the background, poll GET /train/<job_id> for the result
+            training_job = prediction_service.submit_training_job(content, file_format=file_format)
             
             return jsonify({
                 "status": "success",
-                "data": train_results
-            }), 200
+                "data": training_job
+            }), 202
         
         except Exception as e:
             print(f"ERROR: {str(e)}")
@@ -57,9 +67,31 @@ def train_models():
         }), 500
     
 
+@prediction_bp.route('/train/<string:job_id>', methods=["GET"])
+def get_training_job(job_id: str):
+    training_job = prediction_service.get_training_job(job_id)
+
+    if training_job is None:
+        return jsonify({
+            "status": "failed",
+            "error": "Training job not found."
+        }), 404
+
+    return jsonify({
+        "status": "success",
+        "data": training_job
+    }), 200
+    
+
 @prediction_bp.route("/predict/batch", methods=["POST"])
 def predict_batch():
-    """Predict for multiple patients using CSV file."""
+    """Predict for multiple patients using a CSV, Parquet or Arrow file.
+
+    `modelNames` (comma-separated model names, or "all") predicts with several models in one pass instead of
+    `modelName`, and `ensemble` ("hard" or "soft") adds their vote. `ensemble` alone uses every model.
+    `probabilities=true` adds the class probabilities and the confidence of each prediction, it is only supported
+    with a single model, and fails for a model without probabilities (an SVC trained without Config.SVM_PROBABILITY).
+    """
     try:
         if "file" not in request.files:
             return jsonify({
@@ -70,10 +102,38 @@ def predict_batch():
         file = request.files["file"]
 
         model_name = request.form.get("modelName", None)
+        model_names = _parse_model_names(request.form.get("modelNames", ""))
+        ensemble = request.form.get("ensemble") or None
+        if ensemble and not model_names:
+            model_names = "all"
+        probabilities = _is_true(request.form.get("probabilities"))
+        if probabilities and model_names:
+            return jsonify({
+                "status": "failed",
+                "error": "probabilities is not supported with modelNames or ensemble."
+            }), 400
 
         try:
-            filepath = io.StringIO(file.read().decode("utf-8"))
-            prediction_results = prediction_service.predict_batch(filepath, model_name)
+            if _is_true(request.form.get("stream")):
+                file_format = upload_format(file.stream, file.filename)
+
+                # Read the upload in chunks and send each chunk's results as NDJSON
+                return Response(
+                    stream_with_context(_stream_batch_predictions(
+                        file.stream, model_name, file_format, model_names, ensemble, probabilities
+                    )),
+                    mimetype="application/x-ndjson"
+                )
+
+            content = file.read()
+            file_format = upload_format(content, file.filename)
+            if file_format == "csv":
+                filepath = io.StringIO(content.decode("utf-8"))
+            else:
+                filepath = io.BytesIO(content)
+            prediction_results = prediction_service.predict_batch(
+                filepath, model_name, file_format, model_names, ensemble, probabilities
+            )
 
             return jsonify({
                 "status": "success",
@@ -98,6 +158,112 @@ def predict_batch():
             "error": "An unexpected server error occurred."
         }), 500
 
+def _is_true(value):
+    """Whether a flag sent as a form field, query parameter or JSON value is set: true or "true" (any case)."""
+    return value is True or (isinstance(value, str) and value.lower() == "true")
+
+def _parse_model_names(value):
+    """Model names of a multi-model prediction from a comma-separated form field, None when empty."""
+    if value.strip().lower() == "all":
+        return "all"
+
+    model_names = [model_name.strip() for model_name in value.split(",") if model_name.strip()]
+    return model_names or None
+
+def _stream_batch_predictions(stream, model_name, file_format, model_names=None, ensemble=None, probabilities=False):
+    """Yield one JSON line per prediction, or a final error line if a chunk fails."""
+    try:
+        for prediction_results in prediction_service.predict_batch_stream(
+            stream, model_name, file_format, model_names, ensemble, probabilities
+        ):
+            yield "".join(json.dumps(result) + "\n" for result in prediction_results)
+
+    except PredictionError as e:
+        yield json.dumps({
+            "status": "failed",
+            "error": str(e)
+        }) + "\n"
+
+@prediction_bp.route("/predict/bulk", methods=["POST"])
+def predict_bulk():
+    """Predict for many patients sent as a JSON array of records, or as NDJSON (one record per line).
+
+    The model is chosen with the `modelName` query parameter, `probabilities=true` adds the class probabilities.
+    The results are returned in input order, each record with its own status, so that invalid records do not
+    fail the whole request.
+    """
+    try:
+        model_name = request.args.get("modelName", None)
+        probabilities = _is_true(request.args.get("probabilities"))
+
+        if request.mimetype in NDJSON_MIMETYPES:
+            patient_records, line_errors = _read_ndjson_records(request.stream)
+        else:
+            patient_records, line_errors = request.get_json(silent=True), {}
+
+            if not isinstance(patient_records, list):
+                return jsonify({
+                    "status": "failed",
+                    "error": "Expected a JSON array of patient records, or NDJSON with one record per line."
+                }), 400
+
+        if len(patient_records) > Config.BULK_PREDICTION_MAX_RECORDS:
+            return jsonify({
+                "status": "failed",
+                "error": f"Too many patient records, at most {Config.BULK_PREDICTION_MAX_RECORDS} are accepted per request."
+            }), 413
+
+        prediction_results = prediction_service.predict_bulk(patient_records, model_name, probabilities)
+
+        # Lines that were not valid JSON are reported with the parsing error
+        for position, error in line_errors.items():
+            prediction_results[position] = {"index": position, "status": "failed", "error": error}
+
+        return jsonify({
+            "status": "success",
+            "data": prediction_results
+        }), 200
+
+    except PredictionError as e:
+        return jsonify({
+            "status": "failed",
+            "error": str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "status": "failed",
+            "error": "An unexpected server error occurred."
+        }), 500
+
+def _read_ndjson_records(stream):
+    """Parse one patient record per non-empty line, with None and a parsing error for invalid lines."""
+    patient_records, line_errors = [], {}
+
+    for line in stream:
+        if not line.strip():
+            continue
+
+        # Enough to reject the request, the rest of the stream is not parsed
+        if len(patient_records) > Config.BULK_PREDICTION_MAX_RECORDS:
+            break
+
+        try:
+            patient_records.append(json.loads(line))
+        except ValueError as e:
+            line_errors[len(patient_records)] = f"Invalid JSON: {str(e)}"
+            patient_records.append(None)
+
+    return patient_records, line_errors
+
+@prediction_bp.route("/predict/cache", methods=["GET"])
+def get_prediction_cache_stats():
+    """Size and hit/miss counters of the prediction cache."""
+    return jsonify({
+        "status": "success",
+        "data": prediction_service.get_prediction_cache_stats()
+    }), 200
+
 @prediction_bp.route("/predict/single", methods=["POST"])
 def predict_single_patient():
     """Predict for a single patient using form data"""
@@ -107,8 +273,11 @@ def predict_single_patient():
         model_name = None
         if "modelName" in patient_data:
             model_name = patient_data.pop("modelName")
+
+        # Adds the class probabilities and the confidence of the prediction
+        probabilities = _is_true(patient_data.pop("probabilities", False))
             
-        prediction_result = prediction_service.predict_single(patient_data, model_name)
+        prediction_result = prediction_service.predict_single(patient_data, model_name, probabilities)
 
         return jsonify({
             "status": "success",
@@ -119,5 +288,5 @@ def predict_single_patient():
         return jsonify({
             "status": "failed",
             "error": str(e)
-        }), 500
+        }), 400
     
@@ -1,27 +1,63 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 import pandas as pd
+import base64
 import io
+import json
 
-from app.services.visualization_service import VisualizationService
+from app.services.dataset_store import DatasetStore
+from app.services.visualization_cache import VisualizationCache
+from app.services.visualization_service import IMAGE_CONTENT_TYPES, VisualizationService
+from app.config import Config
 from app.core.exceptions import DataPreprocessingError, DataValidationError
+from app.pipeline import read_upload, upload_format
+from app.pipeline.reader import UPLOAD_FORMAT_NAMES
 
 visualization_bp = Blueprint('visualizations', __name__)
 
 visualization_service = VisualizationService()
+visualization_cache = VisualizationCache()
+dataset_store = DatasetStore()
 
 VISUALIZATION_ENDPOINT_MAP = {
     # 'target_distribution': 'get_target_distribution',
-    'numerical_features_boxplot': 'get_numerical_features_boxplot',
-    'numerical_features_pairplot': 'get_numerical_features_pairplot',
-    'numerical_features_violin': 'get_numerical_features_violin',
-    'correlation_heatmap': 'get_correlation_heatmap',
-    'categorical_vs_target': 'get_categorical_vs_target',
+    'numerical_features_boxplot': 'plot_numerical_features_boxplot',
+    'numerical_features_pairplot': 'plot_numerical_features_pairplot',
+    'numerical_features_violin': 'plot_numerical_features_violin',
+    'correlation_heatmap': 'plot_correlation_heatmap',
+    'categorical_vs_target': 'plot_categorical_vs_target',
     # 'age_analysis': 'get_age_analysis',
     # 'radar_chart': 'get_radar_chart',
-    'feature_importance': 'get_feature_importance',
+    'feature_importance': 'plot_feature_importance',
     # 'combined_dashboard': 'get_combined_dashboard'
 }
 
+# Requests with this format get the aggregates behind the chart instead of an image
+CHART_DATA_FORMAT = 'data'
+
+@visualization_bp.route('/datasets', methods=["POST"])
+def upload_dataset():
+    """Upload a dataset once and get an id that every chart request can reuse."""
+    if "file" not in request.files:
+        return jsonify({
+            "status": "failed",
+            "error": "No dataset file provided."
+        }), 400
+    
+    content = request.files["file"].read()
+    df, error_response = _read_dataset(content, request.files["file"].filename)
+    if error_response is not None:
+        return error_response
+    
+    session = dataset_store.add(df, VisualizationCache.fingerprint(content))
+
+    return jsonify({
+        "status": "success",
+        "data": {
+            "datasetId": session.dataset_id,
+            "rows": len(df)
+        }
+    }), 201
+
 @visualization_bp.route('/generate/<string:visualization_name>', methods=["POST"])
 def generate_single_visualization(visualization_name: str):
     if visualization_name not in VISUALIZATION_ENDPOINT_MAP:
@@ -34,51 +70,185 @@ def generate_single_visualization(visualization_name: str):
     return _generate_visualization(service_method_name)
 
 
-def _generate_visualization(viz_name: str):
-    if "file" not in request.files:
-        return jsonify({
-            "status": "failed",
-            "error": "No dataset file provided."
-        }), 400
-    
-    file = request.files["file"]
-    model_name = request.form.get("modelName", None)
-    
+def _read_dataset(content: bytes, filename: str = None):
+    """Parse an uploaded CSV, Parquet or Arrow file, returning the dataframe or the error response to send."""
+    file_format = upload_format(content, filename)
+
     try:
+        if file_format != "csv":
+            return read_upload(io.BytesIO(content), file_format), None
+
         # Read CSV data
-        csv_data = io.StringIO(file.read().decode('utf-8'))
-        df = pd.read_csv(csv_data, skiprows=1)
+        csv_data = io.StringIO(content.decode('utf-8'))
+        return read_upload(csv_data), None
     
     except pd.errors.EmptyDataError:
-        return jsonify({
+        return None, (jsonify({
             "status": "failed",
-            "error": "Uploaded CSV file is empty."
-        }), 400
+            "error": f"Uploaded {UPLOAD_FORMAT_NAMES[file_format]} file is empty."
+        }), 400)
+    
+    except DataValidationError as e:
+        return None, (jsonify({
+            "status": "failed",
+            "error": str(e)
+        }), 400)
     
     except UnicodeDecodeError:
-        return jsonify({
+        return None, (jsonify({
             "status": "failed",
             "error": "Failed to decode file."
-        }), 400
+        }), 400)
     
     except Exception as e:
         print("Visualization error: ", str(e))
-        return jsonify({
+        return None, jsonify({
             "status": "failed",
-            "error": f"Invalid CSV file format: {str(e)}"
+            "error": f"Invalid {UPLOAD_FORMAT_NAMES[file_format]} file format: {str(e)}"
         })
+
+
+def _resolve_dataset():
+    """Find the dataset of a chart request, a previously uploaded dataset id or a file sent with the request.
+
+    Returns the session (or None), the file content (or None), the dataset fingerprint and an error response to send, if any.
+    """
+    dataset_id = request.form.get("datasetId", None)
+
+    if dataset_id:
+        session = dataset_store.get(dataset_id)
+        if session is None:
+            return None, None, None, (jsonify({
+                "status": "failed",
+                "error": "Dataset not found or expired, please upload it again."
+            }), 404)
+        
+        return session, None, session.fingerprint, None
+
+    if "file" in request.files:
+        content = request.files["file"].read()
+        return None, content, VisualizationCache.fingerprint(content), None
+
+    return None, None, None, (jsonify({
+        "status": "failed",
+        "error": "No dataset file provided."
+    }), 400)
+
+
+def _prepare_frame(session, content, model_name):
+    """Return the predicted and labeled frame of the dataset, or the error response to send."""
+    if session is not None:
+        df_viz = dataset_store.get_prepared(session, model_name, visualization_service.prepare_data)
+        return df_viz, None
+    
+    df, error_response = _read_dataset(content, request.files["file"].filename)
+    if error_response is not None:
+        return None, error_response
+    
+    return visualization_service.prepare_data(df, model_name), None
+
+
+def _chart_options():
+    """Read the output format, resolution and transport of a chart request.
+
+    `format` is an image format, or "data" for the aggregates behind the chart as JSON, to be drawn by the client.
+    `dpi` is a number or one of the `Config.VISUALIZATION_DPI_PRESETS` names, e.g. "thumbnail".
+    `transport` is "json" (base64 image in the JSON body) or "raw" (the image itself as the response body).
+    Returns the options and an error response to send, if any.
+    """
+    image_format = request.form.get("format", Config.VISUALIZATION_DEFAULT_FORMAT).lower()
+    dpi = request.form.get("dpi", None)
+    transport = request.form.get("transport", "json").lower()
+
+    if image_format != CHART_DATA_FORMAT and image_format not in IMAGE_CONTENT_TYPES:
+        return None, None, None, (jsonify({
+            "status": "failed",
+            "error": f"Invalid format, expected one of: {', '.join([*IMAGE_CONTENT_TYPES, CHART_DATA_FORMAT])}."
+        }), 400)
+
+    if dpi is None:
+        dpi = Config.VISUALIZATION_DEFAULT_DPI
+    elif dpi in Config.VISUALIZATION_DPI_PRESETS:
+        dpi = Config.VISUALIZATION_DPI_PRESETS[dpi]
+    elif dpi.isdigit() and Config.VISUALIZATION_MIN_DPI <= int(dpi) <= Config.VISUALIZATION_MAX_DPI:
+        dpi = int(dpi)
+    else:
+        return None, None, None, (jsonify({
+            "status": "failed",
+            "error": f"Invalid dpi, expected {Config.VISUALIZATION_MIN_DPI}-{Config.VISUALIZATION_MAX_DPI} "
+                     f"or one of: {', '.join(Config.VISUALIZATION_DPI_PRESETS)}."
+        }), 400)
+
+    if transport not in ("json", "raw"):
+        return None, None, None, (jsonify({
+            "status": "failed",
+            "error": "Invalid transport, expected json or raw."
+        }), 400)
+
+    return image_format, dpi, transport, None
+
+
+def _cache_variant(image_format, dpi):
+    return CHART_DATA_FORMAT if image_format == CHART_DATA_FORMAT else f"{image_format}@{dpi}"
+
+
+def _build_chart(method_name, df_viz, image_format, dpi):
+    """Render a chart, or compute its data, as the bytes stored in the cache."""
+    if image_format == CHART_DATA_FORMAT:
+        return json.dumps(visualization_service.chart_data(method_name, df_viz)).encode()
+    return visualization_service.render(method_name, df_viz, image_format, dpi)
+
+
+def _chart_entry(chart, image_format):
+    if image_format == CHART_DATA_FORMAT:
+        return {
+            "chartData": json.loads(chart),
+            "contentType": "application/json"
+        }
+
+    return {
+        "imageData": base64.b64encode(chart).decode(),
+        "contentType": IMAGE_CONTENT_TYPES[image_format]
+    }
+
+
+def _chart_response(chart, image_format, transport):
+    if transport == "raw" and image_format != CHART_DATA_FORMAT:
+        return Response(chart, mimetype=IMAGE_CONTENT_TYPES[image_format]), 200
+
+    return jsonify({
+        "status": "success",
+        "data": _chart_entry(chart, image_format)
+    }), 200
+
+
+def _generate_visualization(viz_name: str):
+    model_name = request.form.get("modelName", None)
+
+    image_format, dpi, transport, error_response = _chart_options()
+    if error_response is not None:
+        return error_response
+
+    session, content, fingerprint, error_response = _resolve_dataset()
+    if error_response is not None:
+        return error_response
+
+    # Serve the same chart of the same upload from the cache
+    cache_key = visualization_cache.make_key(fingerprint, model_name, viz_name, _cache_variant(image_format, dpi))
+    cached_chart = visualization_cache.get(cache_key)
+
+    if cached_chart is not None:
+        return _chart_response(cached_chart, image_format, transport)
     
     try:
-        viz_method = getattr(visualization_service, viz_name)
-        base64_image_data = viz_method(df, model_name)
+        df_viz, error_response = _prepare_frame(session, content, model_name)
+        if error_response is not None:
+            return error_response
 
-        return jsonify({
-            "status": "success",
-            "data": {
-                "imageData": base64_image_data,
-                "contentType": "image/png"
-            }
-        }), 200
+        chart = _build_chart(viz_name, df_viz, image_format, dpi)
+        visualization_cache.put(cache_key, chart)
+
+        return _chart_response(chart, image_format, transport)
     
     except AttributeError as e:
         print(f"Attribute error when calling {viz_name}: {str(e)}")
@@ -97,4 +267,95 @@ def _generate_visualization(viz_name: str):
         return jsonify({
             "status": "failed",
             "error": f"An unexpected error occurred when {viz_name}: {str(e)}"
-        })
\ No newline at end of file
+        })
+
+
+@visualization_bp.route('/dashboard', methods=["POST"])
+def generate_dashboard():
+    """Render a set of charts (all by default) from one upload in a single request."""
+    model_name = request.form.get("modelName", None)
+    requested_charts = request.form.get("charts", None)
+
+    if requested_charts:
+        visualization_names = [name.strip() for name in requested_charts.split(",") if name.strip()]
+    else:
+        visualization_names = list(VISUALIZATION_ENDPOINT_MAP)
+
+    invalid_names = [name for name in visualization_names if name not in VISUALIZATION_ENDPOINT_MAP]
+    if invalid_names:
+        return jsonify({
+            "status": "failed",
+            "error": f"Invalid visualization specified: {', '.join(invalid_names)}"
+        }), 404
+
+    image_format, dpi, transport, error_response = _chart_options()
+    if error_response is not None:
+        return error_response
+    
+    if transport == "raw":
+        return jsonify({
+            "status": "failed",
+            "error": "Raw transport is only available for single charts."
+        }), 400
+
+    session, content, fingerprint, error_response = _resolve_dataset()
+    if error_response is not None:
+        return error_response
+
+    charts = {}
+    cache_keys = {}
+    for name in visualization_names:
+        cache_keys[name] = visualization_cache.make_key(fingerprint, model_name, VISUALIZATION_ENDPOINT_MAP[name], _cache_variant(image_format, dpi))
+        cached_chart = visualization_cache.get(cache_keys[name])
+        if cached_chart is not None:
+            charts[name] = _chart_entry(cached_chart, image_format)
+
+    missing_names = [name for name in visualization_names if name not in charts]
+
+    if missing_names:
+        try:
+            df_viz, error_response = _prepare_frame(session, content, model_name)
+            if error_response is not None:
+                return error_response
+            
+        except DataPreprocessingError as e:
+            return jsonify({
+                "status": "failed",
+                "error": f"Data preprocessing error: {str(e)}"
+            })
+        
+        except Exception as e:
+            return jsonify({
+                "status": "failed",
+                "error": f"An unexpected error occurred when preparing the dashboard: {str(e)}"
+            })
+
+        method_names = [VISUALIZATION_ENDPOINT_MAP[name] for name in missing_names]
+
+        if image_format == CHART_DATA_FORMAT:
+            # Chart data is cheap to compute, no need for the render pool
+            rendered = {}
+            for method_name in method_names:
+                try:
+                    rendered[method_name] = _build_chart(method_name, df_viz, image_format, dpi)
+                except Exception as e:
+                    print(f"Error computing {method_name}: {str(e)}")
+                    rendered[method_name] = e
+        else:
+            # The prepared frame is computed once and every missing chart is rendered from it in parallel
+            rendered = visualization_service.render_charts(method_names, df_viz, image_format, dpi)
+
+        for name in missing_names:
+            result = rendered[VISUALIZATION_ENDPOINT_MAP[name]]
+            if isinstance(result, Exception):
+                charts[name] = {"error": f"An unexpected error occurred when {VISUALIZATION_ENDPOINT_MAP[name]}: {str(result)}"}
+            else:
+                visualization_cache.put(cache_keys[name], result)
+                charts[name] = _chart_entry(result, image_format)
+
+    return jsonify({
+        "status": "success",
+        "data": {
+            "charts": charts
+        }
+    }), 200
\ No newline at end of file
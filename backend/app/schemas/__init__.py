@@ -1,3 +1,3 @@
-from app.schemas.results import Metrics, TrainResult, PredictionResult
+from app.schemas.results import Metrics, TrainResult, PredictionResult, MultiModelPredictionResult, TrainJob
 
-__all__ = ["Metrics", "TrainResult", "PredictionResult"]
\ No newline at end of file
+__all__ = ["Metrics", "TrainResult", "PredictionResult", "MultiModelPredictionResult", "TrainJob"]
\ No newline at end of file
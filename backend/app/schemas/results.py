@@ -1,4 +1,5 @@
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Any, Dict, Optional
 from uuid import UUID, uuid4
 from pydantic import BaseModel
 
@@ -7,6 +8,8 @@ class Metrics(BaseModel):
     accuracy: float
     precision: float
     recall: float
+    trainingTime: Optional[float] = None
+    evaluationTime: Optional[float] = None
 
 class TrainResult(BaseModel):
     id: UUID = uuid4()
@@ -15,9 +18,29 @@ class TrainResult(BaseModel):
     status: str
     models: Dict[str, Metrics]
     bestModel: str
+    tuning: Optional[Dict[str, Any]] = None
 
 class PredictionResult(BaseModel):
     NACCID: str
     AGE: int
     SEX: int
-    NACCUDSD: int
\ No newline at end of file
+    NACCUDSD: int
+    probabilities: Optional[Dict[str, float]] = None
+    confidence: Optional[float] = None
+
+class MultiModelPredictionResult(BaseModel):
+    NACCID: str
+    AGE: int
+    SEX: int
+    predictions: Dict[str, int]
+    ensemble: Optional[int] = None
+
+class TrainJob(BaseModel):
+    jobId: str
+    status: str
+    submittedAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    timings: Dict[str, float] = {}
+    result: Optional[TrainResult] = None
+    error: Optional[str] = None
\ No newline at end of file
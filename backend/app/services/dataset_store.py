@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from app.config import Config
+from app.pipeline import model_registry
+
+class DatasetSession:
+    """An uploaded dataset and the prepared (predicted and labeled) frames computed from it."""
+
+    def __init__(self, df, fingerprint):
+        self.dataset_id = str(uuid4())
+        self.df = df
+        self.fingerprint = fingerprint
+        self.prepared = {}
+        self.lock = threading.Lock()
+        self.touch()
+
+    def touch(self):
+        self.expires_at = time.time() + Config.DATASET_TTL_SECONDS
+
+
+class DatasetStore:
+    """Keeps uploaded datasets for `Config.DATASET_TTL_SECONDS` after their last use.
+
+    Each chart request for a dataset id reuses the frame prepared for its model
+    instead of cleaning, transforming and predicting the upload again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def add(self, df, fingerprint):
+        """Store an uploaded dataset and return its session."""
+        session = DatasetSession(df, fingerprint)
+
+        with self._lock:
+            self._evict_expired()
+            self._sessions[session.dataset_id] = session
+
+            while len(self._sessions) > Config.DATASET_MAX_ENTRIES:
+                self._sessions.popitem(last=False)
+
+        return session
+
+    def get(self, dataset_id):
+        """Return the session of a dataset id, or None if it is unknown or expired."""
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(dataset_id)
+
+            if session is not None:
+                session.touch()
+                self._sessions.move_to_end(dataset_id)
+
+        return session
+
+    def get_prepared(self, session, model_name, prepare_data):
+        """Return the frame prepared for `model_name`, computing it on first use and again after a retrain."""
+        artifact_version = model_registry.model_version(model_name)
+
+        with session.lock:
+            key = (model_name, artifact_version)
+            if key not in session.prepared:
+                # Frames prepared with older artifacts are no longer needed
+                session.prepared = {k: v for k, v in session.prepared.items() if k[0] != model_name}
+                session.prepared[key] = prepare_data(session.df, model_name)
+            return session.prepared[key]
+
+    def _evict_expired(self):
+        now = time.time()
+        expired = [dataset_id for dataset_id, session in self._sessions.items() if session.expires_at <= now]
+        for dataset_id in expired:
+            del self._sessions[dataset_id]
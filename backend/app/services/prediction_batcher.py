@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+
+from app.config import Config
+from app.core.exceptions import PredictionError
+from app.core.pipeline import AlzheimersPipeline
+
+
+class PendingPrediction:
+    """A single-patient request waiting in the batcher, and the future its caller blocks on."""
+
+    def __init__(self, patient_data, model_name, probabilities=False):
+        self.patient_data = patient_data
+        self.model_name = model_name
+        self.probabilities = probabilities
+        self.future = Future()
+
+    @property
+    def group_key(self):
+        # Only records with the same model, fields and outputs are batched together, so that a record missing
+        # a column still fails validation on its own instead of getting NaN from its neighbours
+        return self.model_name, self.probabilities, frozenset(self.patient_data)
+
+
+class PredictionBatcher:
+    """Coalesces concurrent single-patient predictions into batches.
+
+    Requests are queued and a worker thread collects them for up to `Config.MICROBATCH_MAX_WAIT_MS`
+    after the first one (or until `Config.MICROBATCH_MAX_BATCH_SIZE` are waiting). Each batch is
+    cleaned, transformed and predicted as one frame, and the results are handed back to the waiting
+    callers. If a batch fails, its records are predicted one by one, so every caller gets the
+    result or the error it would have had without batching. A caller waits at most
+    `Config.MICROBATCH_RESULT_TIMEOUT` seconds, so a stuck worker fails requests instead of hanging them.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Only used by the worker thread
+        self._pipeline = AlzheimersPipeline()
+
+    def predict(self, patient_data, model_name=None, probabilities=False):
+        """Queue a single-patient prediction and wait for its result."""
+        pending = PendingPrediction(patient_data, model_name, probabilities)
+
+        self._start_worker()
+        self._queue.put(pending)
+
+        try:
+            return pending.future.result(timeout=Config.MICROBATCH_RESULT_TIMEOUT)
+        except TimeoutError:
+            # Not predicted at all if the worker has not reached it yet
+            pending.future.cancel()
+            raise PredictionError(f"Prediction timed out after {Config.MICROBATCH_RESULT_TIMEOUT} seconds")
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+
+            groups = {}
+            for pending in batch:
+                groups.setdefault(pending.group_key, []).append(pending)
+
+            for group in groups.values():
+                self._predict_group(group)
+
+    def _collect_batch(self):
+        """Block for the first request, then gather the others arriving within the wait window."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + Config.MICROBATCH_MAX_WAIT_MS / 1000
+
+        while len(batch) < Config.MICROBATCH_MAX_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _predict_group(self, group):
+        # Skip the requests whose callers already timed out
+        group = [pending for pending in group if not pending.future.cancelled()]
+
+        if len(group) > 1:
+            try:
+                results = self._pipeline.predict_records(
+                    [pending.patient_data for pending in group], group[0].model_name, group[0].probabilities
+                )
+                for pending, result in zip(group, results):
+                    self._resolve(pending, result)
+                return
+
+            except Exception as e:
+                print(f"Batched prediction failed, predicting {len(group)} records one by one: {str(e)}")
+
+        for pending in group:
+            if pending.future.cancelled():
+                continue
+
+            try:
+                self._resolve(pending, self._pipeline.predict_single(pending.patient_data, pending.model_name, pending.probabilities))
+            except Exception as e:
+                self._resolve(pending, error=PredictionError(f"Prediction error: {str(e)}"))
+
+    @staticmethod
+    def _resolve(pending, result=None, error=None):
+        """Hand a result or an error to the caller, unless it timed out in the meantime."""
+        try:
+            if error is not None:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(result)
+        except InvalidStateError:
+            pass
@@ -2,6 +2,7 @@ import os
 import pandas as pd
 
 from app.core.pipeline import AlzheimersPipeline
+from app.pipeline import prediction_cache
 from app.core.exceptions import (
     DataValidationError, 
     DataPreprocessingError, 
@@ -10,6 +11,8 @@ from app.core.exceptions import (
     PredictionError
 )
 from app.schemas.results import TrainResult, PredictionResult, Metrics
+from app.services.prediction_batcher import PredictionBatcher
+from app.services.training_job_service import TrainingJobService
 from app.config import Config
 
 class PredictionService:
@@ -17,6 +20,8 @@ class PredictionService:
 
     def __init__(self):
         self.pipeline = AlzheimersPipeline()
+        self.training_jobs = TrainingJobService()
+        self.batcher = PredictionBatcher()
 
     def train_models(self, file, user_id=None):
         try:
@@ -28,18 +33,57 @@ class PredictionService:
             print(f"Training error: {str(e)}")
             raise ModelTrainingError(f"Training error: {str(e)}")
         
-    def predict_batch(self, file, model_name=None):
+    def submit_training_job(self, content, user_id=None, file_format="csv"):
         try:
-            prediction_results = self.pipeline.predict_batch(file, model_name)
+            return self.training_jobs.submit(content, user_id, file_format)
+        
+        except Exception as e:
+            print(f"Training error: {str(e)}")
+            raise ModelTrainingError(f"Training error: {str(e)}")
+        
+    def get_training_job(self, job_id):
+        return self.training_jobs.get(job_id)
+        
+    def predict_batch(self, file, model_name=None, file_format="csv", model_names=None, ensemble=None, probabilities=False):
+        try:
+            prediction_results = self.pipeline.predict_batch(
+                file, model_name, file_format=file_format, model_names=model_names, ensemble=ensemble,
+                probabilities=probabilities
+            )
 
             return prediction_results
         
         except Exception as e:
             raise PredictionError(f"Prediction error: {str(e)}")
         
-    def predict_single(self, patient_data, model_name=None):
+    def predict_batch_stream(self, file, model_name=None, file_format="csv", model_names=None, ensemble=None,
+                             probabilities=False):
+        try:
+            for prediction_results in self.pipeline.predict_batch_stream(
+                file, model_name, file_format=file_format, model_names=model_names, ensemble=ensemble,
+                probabilities=probabilities
+            ):
+                yield prediction_results
+        
+        except Exception as e:
+            raise PredictionError(f"Prediction error: {str(e)}")
+        
+    def get_prediction_cache_stats(self):
+        return prediction_cache.stats()
+        
+    def predict_bulk(self, patient_records, model_name=None, probabilities=False):
+        try:
+            return self.pipeline.predict_bulk(patient_records, model_name, probabilities)
+        
+        except Exception as e:
+            raise PredictionError(f"Prediction error: {str(e)}")
+        
+    def predict_single(self, patient_data, model_name=None, probabilities=False):
+        if Config.MICROBATCH_ENABLED:
+            return self.batcher.predict(patient_data, model_name, probabilities)
+
         try:
-            prediction_result = self.pipeline.predict_single(patient_data, model_name)
+            prediction_result = self.pipeline.predict_single(patient_data, model_name, probabilities)
 
             return prediction_result
         
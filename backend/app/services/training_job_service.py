@@ -0,0 +1,123 @@
+import io
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.config import Config
+from app.core.pipeline import AlzheimersPipeline
+from app.schemas.results import TrainJob
+
+
+def _run_training_job(content, user_id, file_format="csv"):
+    """Train the models in a worker process and hand the fitted artifacts back to the server.
+
+    `content` is the decoded text of a CSV upload, or the bytes of a Parquet or Arrow upload.
+    """
+    started_at = datetime.now(timezone.utc)
+
+    source = io.StringIO(content) if isinstance(content, str) else io.BytesIO(content)
+    pipeline = AlzheimersPipeline()
+    train_results = pipeline.train(source, user_id, publish=False, file_format=file_format)
+
+    return {
+        "startedAt": started_at,
+        "result": train_results,
+        "timings": pipeline.stage_timings,
+        "preprocessor": pipeline.data_preprocessor.preprocessor,
+        "inferencePlan": pipeline.data_preprocessor.inference_plan,
+        "models": pipeline.trainer.models,
+        "tuning": pipeline.trainer.cv_results
+    }
+
+
+class TrainingJobService:
+    """Runs training jobs in a background process pool and tracks their status."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._executor = None
+
+    def _get_executor(self):
+        # Created on first use, with "spawn" so workers do not inherit the server's threads
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=Config.TRAINING_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, content, user_id=None, file_format="csv"):
+        """Queue a training job and return its initial status."""
+        job = TrainJob(
+            jobId=str(uuid4()),
+            status="queued",
+            submittedAt=datetime.now(timezone.utc)
+        )
+
+        with self._lock:
+            future = self._get_executor().submit(_run_training_job, content, user_id, file_format)
+            self._jobs[job.jobId] = (job, future)
+            self._prune()
+
+        future.add_done_callback(lambda f: self._finish(job, f))
+
+        return job.model_dump(mode="json")
+
+    def get(self, job_id):
+        """Return the status of a job, or None if it is unknown."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+
+            if entry is None:
+                return None
+
+            job, future = entry
+            if job.status == "queued" and future.running():
+                job.status = "running"
+
+            return job.model_dump(mode="json")
+
+    def _finish(self, job, future):
+        """Publish the artifacts of a finished job and record its outcome.
+
+        The outcome is recorded under the job lock once the models are published, so a job never
+        reads as completed (or finished) while its models are still being saved.
+        """
+        try:
+            outcome = future.result()
+
+            # Models are saved by the server process so that they are published
+            # through this process's registry in a single transaction
+            save_start = time.perf_counter()
+            pipeline = AlzheimersPipeline()
+            pipeline.data_preprocessor.preprocessor = outcome["preprocessor"]
+            pipeline.data_preprocessor.inference_plan = outcome["inferencePlan"]
+            pipeline.trainer.models = outcome["models"]
+            pipeline.trainer.cv_results = outcome["tuning"]
+            pipeline.save_artifacts()
+            save_time = time.perf_counter() - save_start
+
+            with self._lock:
+                job.startedAt = outcome["startedAt"]
+                job.timings = {**outcome["timings"], "save": save_time}
+                job.result = outcome["result"]
+                job.finishedAt = datetime.now(timezone.utc)
+                job.status = "completed"
+
+        except Exception as e:
+            print(f"Training job {job.jobId} failed: {str(e)}")
+            with self._lock:
+                job.error = str(e)
+                job.finishedAt = datetime.now(timezone.utc)
+                job.status = "failed"
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the configured history."""
+        finished = [job_id for job_id, (_, future) in self._jobs.items() if future.done()]
+        for job_id in finished[:max(len(finished) - Config.TRAINING_JOB_HISTORY, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from app.config import Config
+from app.pipeline import model_registry
+
+class VisualizationCache:
+    """LRU cache of rendered visualizations, stored as encoded image bytes.
+
+    Entries are kept in memory up to `Config.VISUALIZATION_CACHE_MAX_BYTES`. When
+    `Config.VISUALIZATION_CACHE_DIR` is set, they are also written to disk, so they
+    survive memory eviction and restarts.
+    """
+
+    def __init__(self, max_bytes=None, cache_dir=None):
+        self.max_bytes = max_bytes if max_bytes is not None else Config.VISUALIZATION_CACHE_MAX_BYTES
+        self.cache_dir = cache_dir if cache_dir is not None else Config.VISUALIZATION_CACHE_DIR
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(content):
+        """Content hash of an uploaded file."""
+        return hashlib.sha256(content).hexdigest()
+
+    def make_key(self, dataset_fingerprint, model_name, viz_name, variant=""):
+        """Cache key of a chart, tied to the version of the preprocessor and model that produced it.
+
+        `variant` distinguishes renderings of the same chart, e.g. its image format and resolution.
+        """
+        artifact_version = model_registry.model_version(model_name)
+        key = f"{dataset_fingerprint}:{model_name}:{viz_name}:{variant}:{artifact_version}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached chart for `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        value = self._read_from_disk(key)
+        if value is not None:
+            self._store_in_memory(key, value)
+        return value
+
+    def put(self, key, value):
+        self._store_in_memory(key, value)
+        self._write_to_disk(key, value)
+
+    def _store_in_memory(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+
+            self._entries[key] = value
+            self._size += size
+
+            # Evict the least recently used charts
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _read_from_disk(self, key):
+        if not self.cache_dir:
+            return None
+
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                value = f.read()
+
+            # Refresh the modification time so pruning removes the least recently used files
+            os.utime(self._disk_path(key))
+            return value
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Visualization cache read error: {str(e)}")
+            return None
+
+    def _write_to_disk(self, key, value):
+        if not self.cache_dir:
+            return
+
+        try:
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, self._disk_path(key))
+
+            self._prune_disk()
+        except OSError as e:
+            print(f"Visualization cache write error: {str(e)}")
+
+    def _prune_disk(self):
+        """Delete the oldest files once the disk tier exceeds its size limit."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".bin"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= Config.VISUALIZATION_CACHE_DISK_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+            except FileNotFoundError:
+                pass
@@ -1,16 +1,20 @@
 import os
 import io
-import base64
+import multiprocessing
+import threading
+import weakref
 import pandas as pd
 import numpy as np
 import matplotlib
 
 matplotlib.use('Agg') # Non-interactive backend
-import matplotlib.pyplot as plt
 import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
 from typing import OrderedDict, Optional, Dict, Any, List, Tuple
 from matplotlib.figure import Figure
 from matplotlib.axes import Axes
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
 from matplotlib.path import Path
 from matplotlib.spines import Spine
 from matplotlib.transforms import Affine2D
@@ -18,29 +22,142 @@ from matplotlib.projections import register_projection
 from matplotlib.gridspec import GridSpec
 
 from app.config import Config
-from app.pipeline import DataPreprocessor, Predictor
+from app.pipeline import DataPreprocessor, Predictor, model_registry
 from app.core.exceptions import DataPreprocessingError
+from app.services.grouped_statistics import binned_kde, compute_grouped_statistics
+
+# Plotting theme: the look of sns.set_theme(style="whitegrid", palette="deep", font_scale=1.1), set on the
+# artists of each figure. rcParams are shared by the whole process, so changing them around a render would
+# leak into the figures drawn by other threads at the same time.
+THEME_FIGSIZE = (12, 8)
+THEME_PALETTE = sns.color_palette("deep")
+THEME_FONT_FAMILY = ['Arial', 'Helvetica', 'sans-serif']
+THEME_TEXT_COLOR = '.15'
+THEME_GRID_COLOR = '.8'  # Also the color of the spines
+THEME_FONT_SIZE = 13.2
+THEME_LEGEND_FONTSIZE = 12.1
+THEME_LEGEND_TITLE_FONTSIZE = 13.2
+# The theme's black: set_theme also remaps the 'k' colour code
+THEME_BLACK = (0.1, 0.1, 0.1)
+
+def _style_ticks(ax: Axes):
+    ax.tick_params(which='major', length=6, width=1.25)
+    ax.tick_params(which='minor', length=4, width=1)
+    ax.tick_params(
+        which='both', bottom=False, left=False, color=THEME_TEXT_COLOR, labelcolor=THEME_TEXT_COLOR,
+        labelsize=10, labelfontfamily=THEME_FONT_FAMILY
+    )
+
+def _style_axes(ax: Axes):
+    """Theme of a new Axes, set before drawing so that the artists added to it follow the theme."""
+    ax.set_prop_cycle(color=THEME_PALETTE)
+    ax.set_axisbelow(True)
+    ax.grid(True, color=THEME_GRID_COLOR, linewidth=1, linestyle='-', solid_capstyle='round')
+    for spine in ax.spines.values():
+        spine.set_edgecolor(THEME_GRID_COLOR)
+        spine.set_linewidth(1.25)
+
+    _style_ticks(ax)
+    ax.title.set_fontsize(14)
+    ax.xaxis.label.set_fontsize(12)
+    ax.yaxis.label.set_fontsize(12)
+
+def _tight_layout(fig: Figure):
+    """`fig.tight_layout()` with its default padding of 1.08 font sizes in the theme's font size."""
+    fig.tight_layout(pad=1.08 * THEME_FONT_SIZE / matplotlib.rcParams['font.size'])
+
+def _finish_theme(fig: Figure):
+    """Theme of what was added to a figure after its axes were created: texts, lines and the axes created
+    by seaborn or matplotlib themselves (colorbars). Legends and bars get the theme's sizes and edges when drawn."""
+    for ax in fig.axes:
+        _style_ticks(ax)
+
+    for text in fig.findobj(Text):
+        text.set_fontfamily(THEME_FONT_FAMILY)
+        if matplotlib.colors.same_color(text.get_color(), 'black'):
+            text.set_color(THEME_TEXT_COLOR)
+
+    for line in fig.findobj(Line2D):
+        line.set_solid_capstyle('round')
+
+# Content type of each supported image format
+IMAGE_CONTENT_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml'
+}
+
+def _json_number(value) -> Optional[float]:
+    """A float for JSON output, None for NaN and infinities."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def _json_list(values) -> List[Optional[float]]:
+    """Floats for JSON output, with None in place of NaN and infinities."""
+    values = np.asarray(values, dtype=float).ravel()
+    finite = np.isfinite(values)
+    if finite.all():
+        return values.tolist()
+
+    values = values.astype(object)
+    values[~finite] = None
+    return values.tolist()
+
+# Pool of worker processes rendering dashboard charts
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+# Service instance of a render worker process
+_worker_service = None
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=Config.VISUALIZATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _render_pool
+
+def _render_chart(method_name: str, df_viz: pd.DataFrame, image_format: str, dpi: int, statistics: Optional[Dict] = None) -> bytes:
+    """Render one chart in a worker process, reusing the grouped statistics computed by the server if given."""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = VisualizationService()
+    if statistics is not None:
+        _worker_service.set_grouped_statistics(df_viz, statistics)
+    return _worker_service.render(method_name, df_viz, image_format, dpi)
 
 class VisualizationService:
     """Service for generating data visualizations."""
 
+    # Charts drawn from the grouped statistics of the numerical features
+    STATISTICS_METHODS = {
+        'plot_numerical_features_boxplot', 'plot_numerical_features_violin',
+        'data_numerical_features_boxplot', 'data_numerical_features_violin'
+    }
+
     def __init__(self):
         self.preprocessor = DataPreprocessor()
         self.predictor = Predictor()
+        self._statistics = OrderedDict()
+        self._statistics_lock = threading.Lock()
         self._setup_style()
         self._setup_mappings()
 
     def _setup_style(self):
-        """Set up the visual style for all plots."""
+        """Set up the visual style for all plots, the theme itself is set on each figure by `_subplots`."""
         self.palette = "RdYlBu_r"
-        sns.set_theme(style="whitegrid", palette="deep", font_scale=1.1)
-        plt.rcParams['figure.figsize'] = (12, 8)
-        plt.rcParams['axes.labelsize'] = 12
-        plt.rcParams['axes.titlesize'] = 14
-        plt.rcParams['xtick.labelsize'] = 10
-        plt.rcParams['ytick.labelsize'] = 10
-        plt.rcParams['font.family'] = 'sans-serif'
-        plt.rcParams['font.sans-serif'] = ['Arial', 'Helvetica']
+
+    def _subplots(self, nrows: int = 1, ncols: int = 1, figsize: Tuple[float, float] = None):
+        """Create a standalone figure and its axes in the plotting theme, without going through pyplot's
+        global figure manager or rcParams."""
+        fig = Figure(figsize=figsize or THEME_FIGSIZE)
+        axes = fig.subplots(nrows, ncols)
+        for ax in np.atleast_1d(axes).flat:
+            _style_axes(ax)
+        return fig, axes
 
     def _setup_mappings(self):
         """Set up label mappings for categorical variables."""
@@ -94,17 +211,23 @@ class VisualizationService:
         
         df = self.preprocessor.prepare_prediction_data(df)
 
-        X, _ = self.preprocessor.transform(df)
+        # Resolve the preprocessor and the model from the same training run, in objects of this call,
+        # so that concurrent renders for other models cannot swap them before the prediction
+        preprocessor = DataPreprocessor()
+        predictor = Predictor()
+        with model_registry.transaction():
+            preprocessor.load()
+            predictor.set_best_model(best_model_name=model_name)
 
-        self.predictor.set_best_model(best_model_name=model_name)
+        X, _ = preprocessor.transform(df)
 
-        target = self.predictor.get_prediction_results(X)
+        target = predictor.get_prediction_results(X)
         df["NACCUDSD"] = target
 
         return df
 
-    def _prepare_data(self, df: pd.DataFrame, model_name: str) -> pd.DataFrame:
-        """Prepare the dataframe with label mappings."""
+    def prepare_data(self, df: pd.DataFrame, model_name: str) -> pd.DataFrame:
+        """Prepare the dataframe with predictions and label mappings. The `plot_*` methods draw from the result without modifying it."""
         df = df.copy()
 
         df = self._get_predictions(df, model_name=model_name)
@@ -118,16 +241,107 @@ class VisualizationService:
         
         return df
     
-    def _fig_to_base64(self, fig: Figure) -> str:
-        """Convert matplotlib figure to base64 string."""
+    def render(self, method_name: str, df_viz: pd.DataFrame, image_format: str = None, dpi: int = None) -> bytes:
+        """Draw a chart with one of the `plot_*` methods and encode it as an image."""
+        fig = getattr(self, method_name)(df_viz)
+        return self.encode_figure(fig, image_format, dpi)
+
+    def grouped_statistics(self, df_viz: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+        """Per-class statistics of the numerical features of a prepared frame, computed once per frame."""
+        with self._statistics_lock:
+            entry = self._statistics.get(id(df_viz))
+            if entry is not None and entry[0]() is df_viz:
+                return entry[1]
+
+        statistics = compute_grouped_statistics(
+            df_viz, Config.NUMERICAL_FEATURES, 'TARGET_LABEL', self.sorted_target_labels
+        )
+        self.set_grouped_statistics(df_viz, statistics)
+        return statistics
+
+    def set_grouped_statistics(self, df_viz: pd.DataFrame, statistics: Dict[str, List[Dict[str, Any]]]):
+        with self._statistics_lock:
+            self._statistics[id(df_viz)] = (weakref.ref(df_viz), statistics)
+
+            # Only the few most recent frames are kept
+            while len(self._statistics) > 8:
+                self._statistics.popitem(last=False)
+
+    def chart_data(self, method_name: str, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """Compute the aggregates behind a chart with the `data_*` counterpart of its `plot_*` method."""
+        return getattr(self, method_name.replace("plot_", "data_", 1))(df_viz)
+
+    def render_charts(self, method_names: List[str], df_viz: pd.DataFrame, image_format: str = None, dpi: int = None) -> Dict[str, Any]:
+        """Render several charts from the same prepared frame concurrently in the render pool.
+
+        Returns the encoded image of each chart, or the exception raised while rendering it.
+        """
+        # Statistics shared by several charts are computed once here rather than in each worker
+        statistics = None
+        if any(name in self.STATISTICS_METHODS for name in method_names):
+            statistics = self.grouped_statistics(df_viz)
+
+        # Each worker gets the columns its chart reads, and the statistics only if the chart draws from them
+        pool = _get_render_pool()
+        futures = {
+            name: pool.submit(
+                _render_chart, name, self._chart_frame(name, df_viz), image_format, dpi,
+                statistics if name in self.STATISTICS_METHODS else None
+            )
+            for name in method_names
+        }
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error rendering {name}: {str(e)}")
+                results[name] = e
+
+        return results
+
+    def _chart_columns(self) -> Dict[str, List[str]]:
+        """Columns of the prepared frame read by each `plot_*` method."""
+        numerical = [*Config.NUMERICAL_FEATURES, 'TARGET_LABEL']
+        return {
+            'plot_numerical_features_boxplot': numerical,
+            'plot_numerical_features_violin': numerical,
+            # NACCUDSD stratifies the sample of the scatter panels
+            'plot_numerical_features_pairplot': [*numerical, 'NACCUDSD'],
+            'plot_correlation_heatmap': Config.FEATURES_WITH_TARGET,
+            'plot_categorical_vs_target': list(self.label_col_names.values()),
+            'plot_feature_importance': [*Config.FEATURES_WITH_TARGET, 'NACCUDSD']
+        }
+
+    def _chart_frame(self, method_name: str, df_viz: pd.DataFrame) -> pd.DataFrame:
+        """The columns of a prepared frame that a chart reads, the whole frame for a chart not listed in `_chart_columns`."""
+        columns = self._chart_columns().get(method_name)
+        if columns is None:
+            return df_viz
+
+        return df_viz[[col for col in dict.fromkeys(columns) if col in df_viz.columns]]
+
+    def encode_figure(self, fig: Figure, image_format: str = None, dpi: int = None) -> bytes:
+        """Save a matplotlib figure as PNG, WebP or SVG bytes."""
+        image_format = image_format or Config.VISUALIZATION_DEFAULT_FORMAT
+        if image_format not in IMAGE_CONTENT_TYPES:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        save_kwargs = {}
+        if image_format == 'svg':
+            # Without a date the same chart always produces the same file
+            save_kwargs['metadata'] = {'Date': None}
+        elif image_format == 'webp':
+            save_kwargs['pil_kwargs'] = {'lossless': True}
+
+        _finish_theme(fig)
+
         img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight', 
-                   facecolor='white', edgecolor='none')
-        img_buffer.seek(0)
-        img_string = base64.b64encode(img_buffer.getvalue()).decode()
-        plt.close(fig)
-        return img_string
-    
+        fig.savefig(img_buffer, format=image_format, dpi=dpi or Config.VISUALIZATION_DEFAULT_DPI, bbox_inches='tight',
+                   facecolor='white', edgecolor='none', **save_kwargs)
+        return img_buffer.getvalue()
+
     # def get_target_distribution(self, df: pd.DataFrame) -> str:
     #     """Generate target distribution plot."""
     #     df_viz = self._prepare_data(df)
@@ -163,45 +377,47 @@ class VisualizationService:
     #     sns.despine(fig=fig, ax=ax, left=True, bottom=True)
     #     fig.tight_layout()
         
-    #     return self._fig_to_base64(fig)
+    #     return fig
     
-    def get_numerical_features_boxplot(self, df: pd.DataFrame, model_name: str) -> str:
-        df_viz = self._prepare_data(df, model_name=model_name)
-        num_features = Config.NUMERICAL_FEATURES
-
-        # Check if features exist
-        missing_features = [f for f in num_features if f not in df_viz.columns]
-        if missing_features:
-            raise DataPreprocessingError(f"Missing required numerical features for boxplot: {','.join(missing_features)}")
+    def plot_numerical_features_boxplot(self, df_viz: pd.DataFrame) -> Figure:
+        num_features = self._require_features(df_viz, Config.NUMERICAL_FEATURES, "boxplot")
+        statistics = self.grouped_statistics(df_viz)
+        colors = self._target_colors()
         
-        fig, axes = plt.subplots(2, 2, figsize=(14,10))
+        fig, axes = self._subplots(2, 2, figsize=(14,10))
         axes = axes.flatten()
 
         for i, col in enumerate(num_features):
             if i >= len(axes): break
             ax = axes[i]
-            sns.boxplot(
-                x="TARGET_LABEL", y=col, data=df_viz,
-                palette=self.palette, order=self.sorted_target_labels,
-                width=0.6, showfliers=True, ax=ax
-            )
+
+            # Boxes are drawn from the precomputed quartiles, whiskers and outliers
+            positions = [j for j, group in enumerate(statistics[col]) if group["count"]]
+            box_stats = [{
+                "label": group["group"], "med": group["median"], "q1": group["q1"], "q3": group["q3"],
+                "whislo": group["whiskerLow"], "whishi": group["whiskerHigh"], "fliers": group["outliers"]
+            } for group in statistics[col] if group["count"]]
+
+            if box_stats:
+                artists = ax.bxp(
+                    box_stats, positions=positions, widths=0.6, patch_artist=True, showfliers=True, manage_ticks=False,
+                    boxprops={"edgecolor": "0.25", "linewidth": 1.25}, whiskerprops={"color": "0.25", "linewidth": 1.25},
+                    capprops={"color": "0.25", "linewidth": 1.25}, medianprops={"color": "0.25", "linewidth": 1.25},
+                    flierprops={"marker": "d", "markerfacecolor": "0.25", "markeredgecolor": "0.25", "markersize": 5}
+                )
+                for box, j in zip(artists["boxes"], positions):
+                    box.set_facecolor(colors[j])
 
             # Add median values
-            if not df_viz.empty and col in df_viz and "TARGET_LABEL" in df_viz:
-                try:
-                    medians = df_viz.groupby("TARGET_LABEL")[col].median()
-                    valid_labels_in_plot = [lbl for lbl in self.sorted_target_labels if lbl in medians.index]
-                    for j, plot_label_text in enumerate(valid_labels_in_plot):
-                        median_val = medians[plot_label_text]
-                        if pd.notna(median_val):
-                             ax.text(
-                                j, median_val, f'Median: {median_val:.1f}',
-                                ha='center', va='bottom', fontsize=9,
-                                color='darkblue', fontweight='bold'
-                            )
-                except Exception as e:
-                    print(f"Note: Could not compute/add medians for {col}: {e}")
+            for j, group in enumerate(statistics[col]):
+                if group["count"] and pd.notna(group["median"]):
+                    ax.text(
+                        j, group["median"], f'Median: {group["median"]:.1f}',
+                        ha='center', va='bottom', fontsize=9,
+                        color='darkblue', fontweight='bold'
+                    )
 
+            self._set_target_axis(ax)
             ax.set_title(f"{self._get_feature_label(col)} by Cognitive Status", fontsize=14)
             ax.set_xlabel("")
             ax.set_ylabel(self._get_feature_label(col), fontsize=12) 
@@ -211,11 +427,10 @@ class VisualizationService:
         for j in range(i + 1, len(axes)):
             fig.delaxes(axes[j])
 
-        fig.tight_layout() 
-        return self._fig_to_base64(fig)
+        _tight_layout(fig) 
+        return fig
     
-    def get_numerical_features_pairplot(self, df: pd.DataFrame, model_name: str) -> str:
-        df_viz = self._prepare_data(df, model_name=model_name)
+    def plot_numerical_features_pairplot(self, df_viz: pd.DataFrame) -> Figure:
         num_features = Config.NUMERICAL_FEATURES
 
         # Check if features exist
@@ -224,60 +439,121 @@ class VisualizationService:
             raise DataPreprocessingError(f"Missing required numerical features for pairplot: {','.join(missing_features)}")
         
         if 'TARGET_LABEL' in df_viz:
-             df_viz['TARGET_LABEL'] = pd.Categorical(df_viz['TARGET_LABEL'], categories=self.sorted_target_labels, ordered=True)
-
-        g = sns.pairplot(
-            df_viz, vars=num_features, hue='TARGET_LABEL',
-            diag_kind='kde', palette=self.palette,
-            plot_kws={'alpha': 0.6, 's': 40, 'edgecolor': 'k', 'linewidth': 0.5},
-            diag_kws={'fill': True, 'alpha': 0.6, 'linewidth': 1.5},
-            height=2.5, aspect=1.2
-        )
-        g.figure.suptitle("Pairwise Relationships Between Numerical Features", y=1.02, fontsize=18)
-        g.figure.tight_layout()
+             df_viz = df_viz.assign(TARGET_LABEL=pd.Categorical(df_viz['TARGET_LABEL'], categories=self.sorted_target_labels, ordered=True))
+
+        # Same layout as sns.pairplot, drawn on our own figure so no pyplot state is involved.
+        # Scatter panels draw a sample stratified by predicted class, so the cost stays bounded for large uploads.
+        n_features = len(num_features)
+        fig, axes = self._subplots(n_features, n_features, figsize=(3 * n_features, 2.5 * n_features))
+        axes = np.atleast_2d(axes)
+        hue = 'TARGET_LABEL' if 'TARGET_LABEL' in df_viz else None
+
+        df_sample = self._stratified_sample(df_viz, Config.PAIRPLOT_MAX_POINTS)
+        use_hexbin = len(df_viz) >= Config.PAIRPLOT_HEXBIN_MIN_ROWS
+
+        labels = list(df_viz[hue].cat.categories) if hue is not None else []
+        label_colors = dict(zip(labels, sns.color_palette(self.palette, len(labels))))
+        if hue is not None:
+            point_colors = [label_colors.get(label, (0.5, 0.5, 0.5)) for label in df_sample[hue]]
+        else:
+            point_colors = None
+
+        for row, y_col in enumerate(num_features):
+            for col, x_col in enumerate(num_features):
+                ax = axes[row, col]
+                if row == col:
+                    groups = [(label, df_viz[x_col][df_viz[hue] == label]) for label in labels] if hue is not None else [(None, df_viz[x_col])]
+                    for label, values in groups:
+                        grid, density = binned_kde(pd.to_numeric(values, errors='coerce').to_numpy(dtype=float))
+                        if grid is None:
+                            continue
+                        color = label_colors.get(label)
+                        ax.fill_between(grid, density, color=color, alpha=0.6, linewidth=0)
+                        ax.plot(grid, density, color=color, linewidth=1.5)
+                    ax.set_ylim(bottom=0)
+                elif use_hexbin and row > col:
+                    # Every row, as densities: too many points to draw one by one
+                    data = df_viz[[x_col, y_col]].apply(pd.to_numeric, errors='coerce').dropna()
+                    ax.hexbin(data[x_col], data[y_col], gridsize=30, cmap='Greys', mincnt=1, bins='log', linewidths=0.2)
+                else:
+                    ax.scatter(
+                        df_sample[x_col], df_sample[y_col], c=point_colors,
+                        alpha=0.6, s=40, edgecolors=THEME_BLACK, linewidths=0.5
+                    )
 
-        return self._fig_to_base64(g.figure)
-    
-    def get_numerical_features_violin(self, df: pd.DataFrame, model_name: str) -> str:
-        df_viz = self._prepare_data(df, model_name=model_name)
-        num_features = Config.NUMERICAL_FEATURES
+                ax.set_xlabel(x_col if row == n_features - 1 else '')
+                ax.set_ylabel(y_col if col == 0 and row != col else '')
+
+        if hue is not None:
+            handles = [
+                Line2D([], [], marker='o', linestyle='', markersize=7, markerfacecolor=label_colors[label], markeredgecolor=THEME_BLACK)
+                for label in labels
+            ]
+            fig.legend(
+                handles, labels, title='TARGET_LABEL', loc='center left', bbox_to_anchor=(1.0, 0.5), frameon=False,
+                fontsize=THEME_LEGEND_FONTSIZE, title_fontsize=THEME_LEGEND_TITLE_FONTSIZE
+            )
 
-        # Check if features exist
-        missing_features = [f for f in num_features if f not in df_viz.columns]
-        if missing_features:
-            raise DataPreprocessingError(f"Missing required numerical features for violin plot: {','.join(missing_features)}")
+        if len(df_sample) < len(df_viz):
+            fig.text(
+                0.5, -0.01, f"Scatter panels show a stratified sample of {len(df_sample):,} of {len(df_viz):,} rows"
+                + ("; lower panels show the density of all rows." if use_hexbin else "."),
+                ha='center', fontsize=10, color='dimgray'
+            )
+
+        fig.suptitle("Pairwise Relationships Between Numerical Features", y=1.02, fontsize=18)
+        _tight_layout(fig)
+
+        return fig
+    
+    def plot_numerical_features_violin(self, df_viz: pd.DataFrame) -> Figure:
+        num_features = self._require_features(df_viz, Config.NUMERICAL_FEATURES, "violin plot")
+        statistics = self.grouped_statistics(df_viz)
+        colors = self._target_colors()
         
-        fig, axes = plt.subplots(2, 2, figsize=(14,10))
+        fig, axes = self._subplots(2, 2, figsize=(14,10))
         axes = axes.flatten()
 
-        # Create violin plot
+        # Create violin plot from the precomputed densities (cut at the data range) and quartiles
         for i, col in enumerate(num_features):
             if i >= len(axes): break
             ax = axes[i]
-            sns.violinplot(
-                x="TARGET_LABEL", y=col, data=df_viz, palette=self.palette, order=self.sorted_target_labels, inner="quartile", cut=0, width=0.8, ax=ax
-            )
 
-            if not df_viz.empty and col in df_viz and "TARGET_LABEL" in df_viz:
-                try:
-                    # Add mean markers
-                    means = df_viz.groupby("TARGET_LABEL")[col].mean()
-                    ymin, ymax = ax.get_ylim()
-                    text_y_position = ymax - (ymax - ymin) * 0.05
-
-                    valid_labels_in_plot = [lbl for lbl in self.sorted_target_labels if lbl in means.index]
-                    for j, plot_label_text in enumerate(valid_labels_in_plot): 
-                        mean_val = means[plot_label_text]
-                        if pd.notna(mean_val):
-                            ax.scatter(j, mean_val, color='white', s=80, zorder=3, edgecolor='black')
-                            ax.scatter(j, mean_val, color='yellow', s=40, zorder=4, marker='*')
-                            ax.text(
-                                j, text_y_position, f'Mean: {mean_val:.2f}',
-                                ha='center', va='top', fontsize=9
-                            )
-                except Exception as e:
-                    print(f"Note: Could not add means for {col}: {e}")
+            positions = [j for j, group in enumerate(statistics[col]) if group["kdeGrid"] is not None]
+            vpstats = [{
+                "coords": group["kdeGrid"], "vals": group["kdeDensity"], "mean": group["mean"],
+                "median": group["median"], "min": group["min"], "max": group["max"]
+            } for group in statistics[col] if group["kdeGrid"] is not None]
+
+            if vpstats:
+                artists = ax.violin(vpstats, positions=positions, widths=0.8, showextrema=False)
+                for body, j in zip(artists["bodies"], positions):
+                    body.set_facecolor(colors[j])
+                    body.set_edgecolor("0.25")
+                    body.set_linewidth(1.25)
+                    body.set_alpha(1)
+
+                # Quartile lines spanning the width of the violin at each quartile
+                for group, j in zip([g for g in statistics[col] if g["kdeGrid"] is not None], positions):
+                    max_density = group["kdeDensity"].max()
+                    for value, linestyle in ((group["q1"], ":"), (group["median"], "--"), (group["q3"], ":")):
+                        half_width = 0.4 * np.interp(value, group["kdeGrid"], group["kdeDensity"]) / max_density
+                        ax.plot([j - half_width, j + half_width], [value, value], color="0.25", linestyle=linestyle, linewidth=1.25)
+
+            # Add mean markers
+            ymin, ymax = ax.get_ylim()
+            text_y_position = ymax - (ymax - ymin) * 0.05
+
+            for j, group in enumerate(statistics[col]):
+                if group["count"] and pd.notna(group["mean"]):
+                    ax.scatter(j, group["mean"], color='white', s=80, zorder=3, edgecolor='black')
+                    ax.scatter(j, group["mean"], color='yellow', s=40, zorder=4, marker='*')
+                    ax.text(
+                        j, text_y_position, f'Mean: {group["mean"]:.2f}',
+                        ha='center', va='top', fontsize=9
+                    )
 
+            self._set_target_axis(ax)
             ax.set_title(f"Distribution of {self._get_feature_label(col)} by Cognitive Status", fontsize=14)
             ax.set_xlabel("")
             ax.set_ylabel(self._get_feature_label(col), fontsize=12)
@@ -286,29 +562,29 @@ class VisualizationService:
         for j in range(i + 1, len(axes)):
             fig.delaxes(axes[j])
 
-        fig.tight_layout()
-        return self._fig_to_base64(fig)
+        _tight_layout(fig)
+        return fig
     
-    def get_correlation_heatmap(self, df: pd.DataFrame, model_name: str) -> str:
-        df_viz = self._prepare_data(df, model_name=model_name)
+    def plot_correlation_heatmap(self, df_viz: pd.DataFrame) -> Figure:
         corr_features = Config.FEATURES_WITH_TARGET
 
         available_corr_features = [f for f in corr_features if f in df_viz.columns]
         if not available_corr_features:
              raise DataPreprocessingError("None of the specified features for correlation heatmap are available.")
         
+        df_corr = df_viz[available_corr_features].copy()
+
         # Ensure columns are numeric
         for f in available_corr_features:
-            if not pd.api.types.is_numeric_dtype(df_viz[f]):
+            if not pd.api.types.is_numeric_dtype(df_corr[f]):
                 try:
-                    df_viz[f] = pd.to_numeric(df_viz[f], errors="coerce")
+                    df_corr[f] = pd.to_numeric(df_corr[f], errors="coerce")
                 except Exception as e:
                     print(f"Warning: Could not convert column {f} to numeric for heatmap: {e}")
 
-        df_corr = df_viz[available_corr_features].copy()
         corr_matrix = df_corr.corr()
 
-        fig, ax = plt.subplots(figsize=(12, 10))
+        fig, ax = self._subplots(figsize=(12, 10))
         mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
 
         sns.heatmap(
@@ -322,40 +598,38 @@ class VisualizationService:
         ax.set_xticklabels(tick_labels, rotation=45, ha="right")
         ax.set_yticklabels(tick_labels, rotation=0)
         ax.set_title("Correlation between Features", fontsize=16, pad=20)
-        fig.tight_layout()
+        _tight_layout(fig)
 
-        return self._fig_to_base64(fig)
+        return fig
     
-    def get_categorical_vs_target(self, df: pd.DataFrame, model_name: str) -> str:
+    def plot_categorical_vs_target(self, df_viz: pd.DataFrame) -> Figure:
         try:
-            df_viz = self._prepare_data(df, model_name=model_name)
-
             if df_viz.empty:
-                print("df_viz is empty after _prepare_data in get_categorical_vs_target.")
+                print("df_viz is empty after prepare_data in plot_categorical_vs_target.")
                 # Return a placeholder or error message image
-                fig, ax = plt.subplots(figsize=(8, 6))
+                fig, ax = self._subplots(figsize=(8, 6))
                 ax.text(0.5, 0.5, "No data available for categorical vs target plot.",
                         horizontalalignment='center', verticalalignment='center',
                         fontsize=14, color='red')
                 ax.axis('off')
-                return self._fig_to_base64(fig)
+                return fig
             
 
             cat_features = ['SEX', 'AMNDEM', 'AMYLPET', 'DYSILL']
 
-            fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+            fig, axes = self._subplots(2, 2, figsize=(14, 10))
             axes = axes.flatten()
 
             if len(axes) == 0:
-                print("Error: Matplotlib failed to create axes in get_categorical_vs_target.")
-                fig, ax = plt.subplots(figsize=(8, 6)) # Create a single placeholder axis
+                print("Error: Matplotlib failed to create axes in plot_categorical_vs_target.")
+                fig, ax = self._subplots(figsize=(8, 6)) # Create a single placeholder axis
                 ax.text(0.5, 0.5, "Plotting error: Could not create axes.",
                     horizontalalignment='center', verticalalignment='center',
                     fontsize=14, color='red')
                 ax.axis('off')
-                return self._fig_to_base64(fig)
+                return fig
 
-            colors = [plt.cm.get_cmap(self.palette)(j/len(self.target_labels_display)) for j in range(len(self.target_labels_display))]
+            colors = [matplotlib.colormaps[self.palette](j/len(self.target_labels_display)) for j in range(len(self.target_labels_display))]
 
             plotted_count = 0
             for i, cat_key in enumerate(cat_features):
@@ -392,7 +666,14 @@ class VisualizationService:
                     # Ensure cont_table columns match sorted_target_labels
                     cont_table = cont_table.reindex(columns=self.sorted_target_labels, fill_value=0)
 
-                    cont_table.plot(kind='bar', stacked=True, ax=ax, color=colors, width=0.7)
+                    # Stacked bars, one segment per cognitive status
+                    x_positions = np.arange(len(cont_table.index))
+                    bottom = np.zeros(len(cont_table.index))
+                    for color, target_label in zip(colors, cont_table.columns):
+                        ax.bar(x_positions, cont_table[target_label].values, width=0.7, bottom=bottom, color=color, edgecolor='white', label=target_label)
+                        bottom += cont_table[target_label].values
+                    ax.set_xticks(x_positions)
+                    ax.set_xticklabels(cont_table.index)
 
                     ax.set_title(f"{self._get_feature_label(cat_key)} vs Cognitive Status", fontsize=14) 
                     ax.set_xlabel(self._get_feature_label(cat_key), fontsize=12)
@@ -401,7 +682,10 @@ class VisualizationService:
 
                     if i == len(cat_features) - 1:
                         legend_disp_labels = [self.target_labels_display[k] for k in sorted(self.target_labels_display.keys())]
-                        ax.legend(title='Cognitive Status', labels=legend_disp_labels)
+                        ax.legend(
+                            title='Cognitive Status', labels=legend_disp_labels,
+                            fontsize=THEME_LEGEND_FONTSIZE, title_fontsize=THEME_LEGEND_TITLE_FONTSIZE
+                        )
                     else:
                         if ax.get_legend() is not None:
                             ax.get_legend().remove()
@@ -411,40 +695,39 @@ class VisualizationService:
                 except Exception as e:
                     print(f"Error plotting '{cat_key}'. Please inspect your dataset.\nError details: {e}")
                     # Add an error message to the subplot instead
-                    fig, ax = plt.subplots(figsize=(8, 6))
+                    fig, ax = self._subplots(figsize=(8, 6))
                     ax.text(0.5, 0.5, f"Error plotting: {e}", horizontalalignment='center', verticalalignment='center', color='red', fontsize=10, wrap=True)
                     ax.set_title(f"{self._get_feature_label(cat_key)} vs Cognitive Status (Error)")
                     ax.axis('off')
-                    return self._fig_to_base64(fig)
+                    return fig
 
             for j in range(i+1, len(axes)):
                 fig.delaxes(axes[j])
             # fig.tight_layout()
-            return self._fig_to_base64(fig)
+            return fig
         
         except Exception as e:
             # Catch any other unexpected errors during the process
-            print(f"An unexpected error occurred in get_categorical_vs_target: {e}")
+            print(f"An unexpected error occurred in plot_categorical_vs_target: {e}")
             # Return a generic error image
-            fig, ax = plt.subplots(figsize=(8, 6))
+            fig, ax = self._subplots(figsize=(8, 6))
             ax.text(0.5, 0.5, f"An unexpected error occurred:\n{e}",
                     horizontalalignment='center', verticalalignment='center',
                     fontsize=14, color='red', wrap=True)
             ax.axis('off')
-            return self._fig_to_base64(fig)
+            return fig
     
-    def get_feature_importance(self, df: pd.DataFrame, model_name: str) -> str:
-        df_viz = self._prepare_data(df, model_name=model_name)
+    def plot_feature_importance(self, df_viz: pd.DataFrame) -> Figure:
 
         if df_viz.empty:
-                print("df_viz is empty after _prepare_data in get_feature_importance.")
+                print("df_viz is empty after prepare_data in plot_feature_importance.")
                 # Return a placeholder or error message image
-                fig, ax = plt.subplots(figsize=(8, 6))
+                fig, ax = self._subplots(figsize=(8, 6))
                 ax.text(0.5, 0.5, "No data available for feature importance plot.",
                         horizontalalignment='center', verticalalignment='center',
                         fontsize=14, color='red')
                 ax.axis('off')
-                return self._fig_to_base64(fig)
+                return fig
         
         importance_features = Config.FEATURES_WITH_TARGET
 
@@ -452,41 +735,41 @@ class VisualizationService:
         target_col = 'NACCUDSD'
         if target_col not in df_viz.columns or not pd.api.types.is_numeric_dtype(df_viz[target_col]):
                  print(f"Error: Target column '{target_col}' is missing or not numeric.")
-                 fig, ax = plt.subplots(figsize=(8, 6))
+                 fig, ax = self._subplots(figsize=(8, 6))
                  ax.text(0.5, 0.5, f"Target column '{target_col}' missing or not numeric for correlation.",
                         horizontalalignment='center', verticalalignment='center',
                         fontsize=12, color='red', wrap=True)
                  ax.axis('off')
-                 return self._fig_to_base64(fig)
+                 return fig
         
         available_features_for_corr = [f for f in importance_features if f in df_viz.columns and pd.api.types.is_numeric_dtype(df_viz[f])]
 
         if not available_features_for_corr:
                  print("Error: No numeric features available for correlation.")
-                 fig, ax = plt.subplots(figsize=(8, 6))
+                 fig, ax = self._subplots(figsize=(8, 6))
                  ax.text(0.5, 0.5, "No numeric features available for correlation.",
                         horizontalalignment='center', verticalalignment='center',
                         fontsize=14, color='red')
                  ax.axis('off')
-                 return self._fig_to_base64(fig)
+                 return fig
 
         df_corr_subset = df_viz[available_features_for_corr]
         target_corr = df_corr_subset.corrwith(df_corr_subset[target_col]).abs().sort_values(ascending=False)
 
         if target_corr.empty or not np.isfinite(target_corr.values).any():
                  print("Warning: Correlation calculation resulted in no finite values.")
-                 fig, ax = plt.subplots(figsize=(8, 6))
+                 fig, ax = self._subplots(figsize=(8, 6))
                  ax.text(0.5, 0.5, "Correlation calculation resulted in no finite values.",
                         horizontalalignment='center', verticalalignment='center',
                         fontsize=14, color='orange', wrap=True)
                  ax.axis('off')
-                 return self._fig_to_base64(fig)
+                 return fig
         
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = self._subplots(figsize=(10, 6))
         sns.barplot(
             x=target_corr.values,
             y=target_corr.index.map(lambda x: self._get_feature_label(x)),
-            palette="viridis", ax=ax
+            palette="viridis", edgecolor='white', ax=ax
         )
 
         if not target_corr.empty:
@@ -507,5 +790,155 @@ class VisualizationService:
 
         ax.set_xlim(0, max(x_limit_upper, 0.15))
 
-        fig.tight_layout() 
-        return self._fig_to_base64(fig)
\ No newline at end of file
+        _tight_layout(fig) 
+        return fig
+    # Chart data: the aggregates behind each chart as JSON, for rendering on the client
+
+    def data_numerical_features_boxplot(self, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """Quartiles, whiskers (1.5 IQR) and outliers of each numerical feature by cognitive status."""
+        num_features = self._require_features(df_viz, Config.NUMERICAL_FEATURES, "boxplot")
+        statistics = self.grouped_statistics(df_viz)
+
+        features = []
+        for col in num_features:
+            groups = [{
+                "target": group["group"],
+                "count": group["count"],
+                "q1": _json_number(group["q1"]),
+                "median": _json_number(group["median"]),
+                "q3": _json_number(group["q3"]),
+                "whiskerLow": _json_number(group["whiskerLow"]),
+                "whiskerHigh": _json_number(group["whiskerHigh"]),
+                "outliers": _json_list(group["outliers"])
+            } for group in statistics[col]]
+
+            features.append({"feature": col, "label": self._get_feature_label(col), "groups": groups})
+
+        return {"targets": self.sorted_target_labels, "features": features}
+
+    def data_numerical_features_pairplot(self, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """The numerical features and cognitive status of each row (of the stratified sample for large uploads), as columns."""
+        num_features = self._require_features(df_viz, Config.NUMERICAL_FEATURES, "pairplot")
+        total_rows = len(df_viz)
+        df_viz = self._stratified_sample(df_viz, Config.PAIRPLOT_MAX_POINTS)
+
+        return {
+            "totalRows": total_rows,
+            "sampledRows": len(df_viz),
+            "targets": self.sorted_target_labels,
+            "features": num_features,
+            "labels": [self._get_feature_label(col) for col in num_features],
+            "points": {
+                **{col: _json_list(df_viz[col].to_numpy(dtype=float)) for col in num_features},
+                "target": df_viz["TARGET_LABEL"].where(df_viz["TARGET_LABEL"].notna(), None).tolist()
+            }
+        }
+
+    def data_numerical_features_violin(self, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """Density curve (cut at the data range, as in the plot), quartiles and mean of each numerical feature by cognitive status."""
+        num_features = self._require_features(df_viz, Config.NUMERICAL_FEATURES, "violin plot")
+        statistics = self.grouped_statistics(df_viz)
+
+        features = []
+        for col in num_features:
+            groups = [{
+                "target": group["group"],
+                "count": group["count"],
+                "mean": _json_number(group["mean"]),
+                "quartiles": _json_list([group["q1"], group["median"], group["q3"]]),
+                "grid": _json_list(group["kdeGrid"] if group["kdeGrid"] is not None else []),
+                "density": _json_list(group["kdeDensity"] if group["kdeDensity"] is not None else [])
+            } for group in statistics[col]]
+
+            features.append({"feature": col, "label": self._get_feature_label(col), "groups": groups})
+
+        return {"targets": self.sorted_target_labels, "features": features}
+
+    def data_correlation_heatmap(self, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """Pairwise correlation matrix of the features and the predicted cognitive status."""
+        available_corr_features = [f for f in Config.FEATURES_WITH_TARGET if f in df_viz.columns]
+        if not available_corr_features:
+             raise DataPreprocessingError("None of the specified features for correlation heatmap are available.")
+
+        corr_matrix = df_viz[available_corr_features].apply(pd.to_numeric, errors="coerce").corr()
+
+        return {
+            "features": available_corr_features,
+            "labels": [self._get_feature_label(col) for col in available_corr_features],
+            "matrix": [_json_list(row) for row in corr_matrix.to_numpy()]
+        }
+
+    def data_categorical_vs_target(self, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """Share of each cognitive status within each category of the categorical features."""
+        cat_features = ['SEX', 'AMNDEM', 'AMYLPET', 'DYSILL']
+
+        features = []
+        for cat_key in cat_features:
+            cat_label_col = self.label_col_names[cat_key]
+            if cat_label_col not in df_viz.columns or 'TARGET_LABEL' not in df_viz.columns:
+                print(f"Warning: Required columns '{cat_label_col}' or 'TARGET_LABEL' not found in df_viz. Skipping '{cat_key}'.")
+                continue
+
+            cont_table = pd.crosstab(df_viz[cat_label_col], df_viz['TARGET_LABEL'], normalize='index')
+            cont_table = cont_table.reindex(columns=self.sorted_target_labels, fill_value=0)
+
+            features.append({
+                "feature": cat_key,
+                "label": self._get_feature_label(cat_key),
+                "categories": [str(category) for category in cont_table.index],
+                "proportions": {target_label: _json_list(cont_table[target_label].to_numpy()) for target_label in cont_table.columns}
+            })
+
+        return {"targets": self.sorted_target_labels, "features": features}
+
+    def data_feature_importance(self, df_viz: pd.DataFrame) -> Dict[str, Any]:
+        """Absolute correlation of each feature with the predicted cognitive status, strongest first."""
+        target_col = 'NACCUDSD'
+        if target_col not in df_viz.columns or not pd.api.types.is_numeric_dtype(df_viz[target_col]):
+            raise DataPreprocessingError(f"Target column '{target_col}' missing or not numeric for correlation.")
+
+        available_features_for_corr = [f for f in Config.FEATURES_WITH_TARGET if f in df_viz.columns and pd.api.types.is_numeric_dtype(df_viz[f])]
+        df_corr_subset = df_viz[available_features_for_corr]
+        target_corr = df_corr_subset.corrwith(df_corr_subset[target_col]).abs().sort_values(ascending=False)
+
+        return {
+            "features": [
+                {"feature": f, "label": self._get_feature_label(f), "correlation": _json_number(v)}
+                for f, v in target_corr.items()
+            ]
+        }
+
+    def _stratified_sample(self, df_viz: pd.DataFrame, max_rows: int, random_state: int = 0) -> pd.DataFrame:
+        """Sample up to `max_rows` rows, keeping the share of each predicted class.
+
+        Each class keeps at least `Config.PAIRPLOT_MIN_POINTS_PER_CLASS` rows (or all of them),
+        so rare classes stay visible. The sample is deterministic so cached charts are reproducible.
+        """
+        if len(df_viz) <= max_rows or 'NACCUDSD' not in df_viz:
+            return df_viz
+
+        rng = np.random.default_rng(random_state)
+        classes = df_viz['NACCUDSD'].to_numpy()
+        selected = []
+        for target in pd.unique(classes):
+            positions = np.flatnonzero(classes == target) if pd.notna(target) else np.flatnonzero(pd.isna(classes))
+            quota = max(int(round(max_rows * len(positions) / len(df_viz))), Config.PAIRPLOT_MIN_POINTS_PER_CLASS)
+            selected.append(rng.choice(positions, size=min(quota, len(positions)), replace=False))
+
+        return df_viz.iloc[np.sort(np.concatenate(selected))]
+
+    def _require_features(self, df_viz: pd.DataFrame, features: List[str], chart_name: str) -> List[str]:
+        missing_features = [f for f in features if f not in df_viz.columns]
+        if missing_features:
+            raise DataPreprocessingError(f"Missing required numerical features for {chart_name}: {','.join(missing_features)}")
+        return features
+
+    def _target_colors(self) -> List[Tuple[float, float, float]]:
+        """Fill color of each cognitive status, as seaborn draws the palette on boxes and violins."""
+        return [sns.desaturate(color, 0.75) for color in sns.color_palette(self.palette, len(self.sorted_target_labels))]
+
+    def _set_target_axis(self, ax: Axes):
+        """Label the x axis with the cognitive statuses, in order."""
+        ax.set_xticks(range(len(self.sorted_target_labels)))
+        ax.set_xticklabels(self.sorted_target_labels)
+        ax.set_xlim(-0.5, len(self.sorted_target_labels) - 0.5)
@@ -0,0 +1,55 @@
+"""Compare the per-row and the columnar builders of batch prediction results.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_results
+"""
+import numpy as np
+import pandas as pd
+
+from app.pipeline import Predictor
+from app.schemas.results import PredictionResult
+from benchmarks.timing import best_of
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def make_batch(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "AGE": rng.integers(50, 100, n_rows).astype(float),
+        "SEX": rng.integers(1, 3, n_rows).astype(float),
+    }, index=pd.Index([f"NACC{i:07d}" for i in range(n_rows)], name="NACCID"))
+    predictions = rng.integers(1, 5, n_rows)
+    return X, predictions
+
+
+def build_results_per_row(X, predictions):
+    """The loop used by `Predictor.predict_batch` before the columnar builder."""
+    results = []
+    for idx, prediction in enumerate(predictions):
+        result = PredictionResult(
+            NACCID=str(X.index[idx]),
+            AGE=int(X["AGE"].iloc[idx]),
+            SEX=int(X["SEX"].iloc[idx]),
+            NACCUDSD=int(prediction)
+        ).model_dump(exclude_none=True)
+        results.append(result)
+    return results
+
+
+def main():
+    predictor = Predictor()
+
+    print(f"{'rows':>8} {'per-row (s)':>12} {'columnar (s)':>13} {'speed-up':>9}")
+    for n_rows in SIZES:
+        X, predictions = make_batch(n_rows)
+
+        loop_time, loop_results = best_of(build_results_per_row, X, predictions)
+        columnar_time, columnar_results = best_of(predictor.build_results, X, predictions)
+
+        assert loop_results == columnar_results
+        print(f"{n_rows:>8} {loop_time:>12.4f} {columnar_time:>13.4f} {loop_time / columnar_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compare time and memory of `DataPreprocessor._clean_data` with the chained cleaning steps it replaced.
+
+Each variant runs in its own process so that the peak RSS of one does not hide the other.
+Run from the backend directory (the number of rows can be passed as an argument):
+    python -m benchmarks.bench_clean_data 1000000
+"""
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.pipeline import DataPreprocessor
+
+DEFAULT_ROWS = 1_000_000
+
+
+def make_upload(n_rows, seed=0):
+    """A raw upload with BIRTHYR instead of AGE, invalid codes and out of range values, plus unused columns."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "NACCID": [f"NACC{i:07d}" for i in range(n_rows)],
+        "BIRTHYR": rng.integers(1920, 1970, n_rows),
+        "EDUC": rng.choice([*range(0, 40), 99, -4], n_rows),
+        "UDSBENTC": rng.choice([*range(0, 20), 95, 96, 97, 98, -4], n_rows),
+        "SEX": rng.choice([1, 2, 99, -4], n_rows),
+        "MOCATRAI": rng.choice([0, 1, 95, -4], n_rows),
+        "AMNDEM": rng.choice([0, 1, 8, -4], n_rows),
+        "NACCPPAG": rng.choice([1, 2, 3, 4, 7, 8, -4], n_rows),
+        "AMYLPET": rng.choice([0, 1, 8, -4], n_rows),
+        "DYSILL": rng.choice([0, 1, -4], n_rows),
+        "DYSILLIF": rng.choice([1, 2, 3, 7, 8, -4], n_rows),
+        "NACCUDSD": rng.integers(1, 5, n_rows),
+    })
+    # Columns of the NACC export that are not used as features
+    for i in range(10):
+        df[f"EXTRA{i}"] = rng.random(n_rows)
+    return df
+
+
+def clean_data_chained(df, for_training):
+    """The cleaning steps as they were chained before, each one copying the frame."""
+    # 1. Calculate age
+    if "AGE" not in df.columns and "BIRTHYR" in df.columns:
+        df = df.copy()
+        df["AGE"] = 2025 - df["BIRTHYR"]
+
+    # 2. Replace invalid values
+    df = df.copy()
+    replace_na = {
+        "SEX": [99, -4], "EDUC": [99, -4], "UDSBENTC": [95, 96, 97, 98, -4], "MOCATRAI": [95, 96, 97, 98, -4],
+        "AMNDEM": [-4], "NACCPPAG": [-4], "AMYLPET": [8, -4], "DYSILL": [-4], "DYSILLIF": [-4],
+    }
+    for col, invalid_vals in replace_na.items():
+        if col in df.columns:
+            df[col] = df[col].replace(invalid_vals, np.nan)
+
+    # 3. Validate data ranges
+    validation_ranges = {"EDUC": list(range(0, 37)), "UDSBENTC": list(range(0, 18))}
+    for col, allowed_values in validation_ranges.items():
+        if col in df.columns:
+            min_val, max_val = min(allowed_values), max(allowed_values)
+            invalid_mask = (df[col] < min_val) | (df[col] > max_val)
+            if invalid_mask.any():
+                df.loc[invalid_mask, col] = df.loc[invalid_mask, col].clip(min_val, max_val)
+
+    # 4. Feature selection
+    selected_columns = Config.FEATURES_WITH_TARGET if for_training else Config.FEATURES
+    return df[[col for col in selected_columns if col in df.columns]].copy()
+
+
+def clean_data_rules(df, for_training):
+    return DataPreprocessor()._clean_data(df, for_training)
+
+
+VARIANTS = {"chained": clean_data_chained, "rule table": clean_data_rules}
+
+
+def measure(variant, n_rows, queue):
+    df = make_upload(n_rows)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    VARIANTS[variant](df, for_training=True)
+    elapsed = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux
+    queue.put((elapsed, traced_peak / 1024 ** 2, (rss_after - rss_before) / 1024))
+
+
+def check_parity(n_rows=100_000):
+    df = make_upload(n_rows)
+    original = df.copy()
+    for for_training in (True, False):
+        pd.testing.assert_frame_equal(clean_data_chained(df, for_training), clean_data_rules(df, for_training))
+    pd.testing.assert_frame_equal(df, original)
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    check_parity()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'variant':<12} {'rows':>9} {'time (s)':>9} {'peak alloc (MB)':>16} {'peak RSS growth (MB)':>21}")
+    for variant in VARIANTS:
+        queue = context.Queue()
+        process = context.Process(target=measure, args=(variant, n_rows, queue))
+        process.start()
+        elapsed, traced_peak, rss_growth = queue.get()
+        process.join()
+        print(f"{variant:<12} {n_rows:>9} {elapsed:>9.2f} {traced_peak:>16.0f} {rss_growth:>21.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Compare encode time and payload size of each chart per image format and resolution.
+
+Run from the backend directory:
+    python -m benchmarks.bench_image_formats
+"""
+import base64
+import time
+
+from app.config import Config
+from app.routes.visualization_routes import VISUALIZATION_ENDPOINT_MAP
+from app.services.visualization_service import IMAGE_CONTENT_TYPES, VisualizationService
+from benchmarks.stress_visualization_threads import make_frame
+from benchmarks.timing import best_of
+
+
+def main():
+    service = VisualizationService()
+    df_viz = make_frame(service)
+
+    print(f"{'chart':<35} {'format':<6} {'dpi':>4} {'draw (ms)':>10} {'encode (ms)':>12} {'raw (KB)':>9} {'base64 (KB)':>12}")
+    for method_name in VISUALIZATION_ENDPOINT_MAP.values():
+        draw_time, fig = best_of(getattr(service, method_name), df_viz)
+
+        for image_format in IMAGE_CONTENT_TYPES:
+            for dpi in sorted(set(Config.VISUALIZATION_DPI_PRESETS.values())):
+                if image_format == "svg" and dpi != Config.VISUALIZATION_DEFAULT_DPI:
+                    continue  # Vector output does not depend on the resolution
+
+                encode_time, image_data = best_of(service.encode_figure, fig, image_format, dpi)
+                start = time.perf_counter()
+                encoded = base64.b64encode(image_data)
+                base64_time = time.perf_counter() - start
+
+                print(
+                    f"{method_name:<35} {image_format:<6} {dpi:>4} {draw_time * 1000:>10.0f} "
+                    f"{(encode_time + base64_time) * 1000:>12.0f} {len(image_data) / 1024:>9.0f} {len(encoded) / 1024:>12.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the latency of `DataPreprocessor.transform` through the `ColumnTransformer` and through the
+compiled `InferencePlan`, alone and followed by each model's predictions, for batch sizes from 1 to 100k.
+
+Checks first that both paths give the same features and the same predictions.
+Run from the backend directory:
+    python -m benchmarks.bench_inference_plan
+"""
+import numpy as np
+
+from app.config import Config
+from app.pipeline import DataPreprocessor, model_registry
+from app.pipeline.inference_plan import InferencePlan
+from benchmarks.bench_clean_data import make_upload
+from benchmarks.timing import best_of
+
+BATCH_SIZES = [1, 10, 100, 1000, 10_000, 100_000]
+REPEATS = 5
+
+
+def transform(preprocessor, X, use_plan):
+    Config.INFERENCE_PLAN_ENABLED = use_plan
+    try:
+        return preprocessor.transform(X)[0]
+    finally:
+        Config.INFERENCE_PLAN_ENABLED = True
+
+
+def check_parity(preprocessor, models, X):
+    expected = transform(preprocessor, X, use_plan=False)
+    actual = transform(preprocessor, X, use_plan=True)
+
+    assert list(expected.columns) == list(actual.columns)
+    assert expected.index.equals(actual.index)
+    # The ColumnTransformer keeps the float32 of compact uploads, the plan computes in float64
+    np.testing.assert_allclose(expected.to_numpy(dtype=np.float64), actual.to_numpy(), rtol=1e-6, atol=1e-6)
+
+    for model_name, model in models.items():
+        mismatches = (model.predict(expected) != model.predict(actual)).sum()
+        print(f"parity {model_name}: {mismatches} of {len(X)} predictions differ")
+
+
+def main():
+    preprocessor = DataPreprocessor()
+    preprocessor.load()
+    if preprocessor.inference_plan is None:
+        print("No exported inference plan, compiling one from the saved preprocessor")
+        preprocessor.inference_plan = InferencePlan.compile(preprocessor.preprocessor)
+
+    models = model_registry.get_models()
+    df = make_upload(max(BATCH_SIZES)).set_index("NACCID")
+    X_all = preprocessor.prepare_prediction_data(df)
+    check_parity(preprocessor, models, X_all)
+
+    print(f"{'rows':>7} {'step':<22} {'sklearn (ms)':>13} {'plan (ms)':>10} {'speedup':>8}")
+    for batch_size in BATCH_SIZES:
+        X = X_all.iloc[:batch_size]
+        repeats = REPEATS if batch_size < 100_000 else 2
+
+        steps = {"transform": lambda use_plan: transform(preprocessor, X, use_plan)}
+        for model_name, model in models.items():
+            steps[f"transform+{model_name}"] = lambda use_plan, model=model: model.predict(transform(preprocessor, X, use_plan))
+
+        for step, func in steps.items():
+            sklearn_time, _ = best_of(func, False, repeats=repeats)
+            plan_time, _ = best_of(func, True, repeats=repeats)
+            print(f"{batch_size:>7} {step:<22} {sklearn_time * 1000:>13.2f} {plan_time * 1000:>10.2f} {sklearn_time / plan_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
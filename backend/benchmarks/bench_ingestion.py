@@ -0,0 +1,103 @@
+"""Compare reading a wide NACC extract with pandas defaults against `read_upload` (selected columns, compact dtypes),
+from CSV and, when pyarrow is installed, from Parquet and Arrow IPC.
+
+Run from the backend directory (the number of rows and of unused columns can be passed as arguments):
+    python -m benchmarks.bench_ingestion 200000 300
+"""
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.pipeline import DataPreprocessor, read_upload
+from benchmarks.bench_clean_data import make_upload
+
+DEFAULT_ROWS = 200_000
+DEFAULT_EXTRA_COLUMNS = 300
+
+
+def make_extract(n_rows, n_extra_columns, seed=0):
+    """A NACC-like extract: the feature columns and many columns that are not used."""
+    rng = np.random.default_rng(seed)
+    extra = pd.DataFrame(rng.integers(-4, 100, (n_rows, n_extra_columns)), columns=[f"NACCEXTRA{i}" for i in range(n_extra_columns)])
+    return pd.concat([make_upload(n_rows, seed=seed), extra], axis=1)
+
+
+def make_csv(df):
+    """The CSV export of an extract, with its title line."""
+    buffer = io.StringIO()
+    buffer.write("NACC export\n")
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def make_uploads(df):
+    """The content of an extract in each upload format that can be read here."""
+    uploads = {"csv": make_csv(df)}
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return uploads
+
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    uploads["parquet"] = buffer.getvalue()
+
+    buffer = io.BytesIO()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_file(buffer, table.schema) as writer:
+        writer.write_table(table)
+    uploads["arrow"] = buffer.getvalue()
+    return uploads
+
+
+def read_default(uploads):
+    return pd.read_csv(io.StringIO(uploads["csv"]), skiprows=1)
+
+
+def read_compact(uploads):
+    return read_upload(io.StringIO(uploads["csv"]))
+
+
+VARIANTS = {
+    "default": read_default,
+    "compact": read_compact,
+    "parquet": lambda uploads: read_upload(uploads["parquet"], "parquet"),
+    "arrow": lambda uploads: read_upload(uploads["arrow"], "arrow"),
+}
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    n_extra_columns = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EXTRA_COLUMNS
+    uploads = make_uploads(make_extract(n_rows, n_extra_columns))
+    preprocessor = DataPreprocessor()
+
+    cleaned = {}
+    print(f"{'variant':<8} {'rows':>8} {'columns':>8} {'read (s)':>9} {'frame (MB)':>11} {'clean (s)':>10} {'cleaned (MB)':>13}")
+    for variant, read in VARIANTS.items():
+        if variant in ("parquet", "arrow") and variant not in uploads:
+            continue
+
+        start = time.perf_counter()
+        df = read(uploads)
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cleaned[variant] = preprocessor._clean_data(df.set_index("NACCID"), for_training=True)
+        clean_time = time.perf_counter() - start
+
+        print(
+            f"{variant:<8} {n_rows:>8} {df.shape[1]:>8} {read_time:>9.2f} {df.memory_usage(deep=True).sum() / 1024 ** 2:>11.1f} "
+            f"{clean_time:>10.2f} {cleaned[variant].memory_usage(deep=True).sum() / 1024 ** 2:>13.1f}"
+        )
+
+    # Same cleaned values, only the dtypes differ
+    for variant in cleaned:
+        pd.testing.assert_frame_equal(cleaned["default"], cleaned[variant], check_dtype=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Latency and throughput of /predict/single under concurrent load, with and without micro-batching.
+
+Each client thread sends single-patient predictions back to back through `PredictionService`.
+Checks first that batching returns the same results and errors as one call per request.
+Run from the backend directory:
+    python -m benchmarks.bench_microbatch
+"""
+import threading
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.services.prediction_service import PredictionService
+
+CONCURRENCY = [1, 8, 32, 64]
+REQUESTS_PER_CLIENT = 40
+MODEL_NAME = "decisionTree"
+
+
+def make_patients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "BIRTHYR": int(rng.integers(1920, 1970)),
+            "SEX": int(rng.choice([1, 2])),
+            "EDUC": int(rng.choice([*range(0, 30), 99])),
+            "UDSBENTC": int(rng.choice([*range(0, 18), 95])),
+            "MOCATRAI": int(rng.choice([0, 1, 95])),
+            "AMNDEM": int(rng.choice([0, 1, 8])),
+            "NACCPPAG": int(rng.choice([1, 2, 3, 4, 8])),
+            "AMYLPET": int(rng.choice([0, 1, 8])),
+            "DYSILL": int(rng.choice([0, 1])),
+            "DYSILLIF": int(rng.choice([1, 2, 8])),
+        }
+        for _ in range(n)
+    ]
+
+
+def outcome(service, patient):
+    try:
+        return service.predict_single(dict(patient), MODEL_NAME)
+    except Exception as e:
+        return f"{type(e).__name__}: {str(e)}"
+
+
+def check_parity(service):
+    patients = make_patients(200, seed=1)
+    # Requests that fail on their own must fail the same way inside a batch
+    patients[3] = {key: value for key, value in patients[3].items() if key != "EDUC"}
+    patients[7] = {**patients[7], "SEX": 99}
+    patients[11] = {**patients[11], "EDUC": "twelve"}
+
+    Config.MICROBATCH_ENABLED = False
+    expected = [outcome(service, patient) for patient in patients]
+
+    Config.MICROBATCH_ENABLED = True
+    actual = [None] * len(patients)
+
+    def send(i):
+        actual[i] = outcome(service, patients[i])
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(patients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert actual == expected, [(a, e) for a, e in zip(actual, expected) if a != e][:3]
+
+
+def run_load(service, n_clients):
+    patients = make_patients(n_clients * REQUESTS_PER_CLIENT)
+    latencies = [[] for _ in range(n_clients)]
+
+    def client(i):
+        for patient in patients[i::n_clients]:
+            start = time.perf_counter()
+            service.predict_single(dict(patient), MODEL_NAME)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    service = PredictionService()
+    check_parity(service)
+
+    print(f"Micro-batching: max wait {Config.MICROBATCH_MAX_WAIT_MS} ms, max batch size {Config.MICROBATCH_MAX_BATCH_SIZE}")
+    print(f"{'clients':>7} {'batching':<9} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for n_clients in CONCURRENCY:
+        for enabled in (False, True):
+            Config.MICROBATCH_ENABLED = enabled
+            throughput, p50, p99 = run_load(service, n_clients)
+            print(f"{n_clients:>7} {'on' if enabled else 'off':<9} {throughput:>8.0f} {p50:>9.1f} {p99:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
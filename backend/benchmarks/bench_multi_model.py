@@ -0,0 +1,68 @@
+"""Time predicting a batch with every model: one `predict_batch` call per model against one multi-model call.
+
+The multi-model call reads, cleans and transforms the upload once and runs the models side by side in threads.
+Checks that each model's predictions match its single-model call (with probabilities for the soft vote, whose
+classes are the most probable ones). The prediction cache is disabled so that every call does the full work. Run from the backend directory (the number of rows can be passed as an argument):
+    python -m benchmarks.bench_multi_model 100000
+"""
+import io
+import sys
+import time
+
+from app.config import Config
+from app.core.pipeline import AlzheimersPipeline
+from benchmarks.bench_clean_data import make_upload
+from benchmarks.bench_prediction_cache import to_csv
+
+DEFAULT_ROWS = 100_000
+MODEL_NAMES = ["svm", "naiveBayes", "decisionTree"]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    Config.PREDICTION_CACHE_ENABLED = False
+    pipeline = AlzheimersPipeline()
+    content = to_csv(make_upload(n_rows))
+
+    separate_time = 0.0
+    expected = {}
+    expected_soft = {}
+    for model_name in MODEL_NAMES:
+        elapsed, results = timed(lambda: pipeline.predict_batch(io.StringIO(content), model_name))
+        separate_time += elapsed
+        expected[model_name] = [result["NACCUDSD"] for result in results]
+
+        try:
+            results = pipeline.predict_batch(io.StringIO(content), model_name, probabilities=True)
+            expected_soft[model_name] = [result["NACCUDSD"] for result in results]
+        except Exception:
+            pass  # No probabilities, the soft vote fails for this model
+    print(f"{n_rows} rows, {len(MODEL_NAMES)} models")
+    print(f"{'mode':<30} {'time (s)':>9}")
+    print(f"{'one call per model':<30} {separate_time:>9.2f}")
+
+    for n_jobs in (1, -1):
+        for ensemble in (None, "hard", "soft"):
+            Config.MULTI_MODEL_N_JOBS = n_jobs
+            try:
+                elapsed, results = timed(
+                    lambda: pipeline.predict_batch(io.StringIO(content), None, model_names=MODEL_NAMES, ensemble=ensemble)
+                )
+            except Exception as e:
+                print(f"{f'multi-model, n_jobs={n_jobs}, {ensemble}':<30} failed: {str(e)}")
+                continue
+
+            for model_name in MODEL_NAMES:
+                model_expected = expected_soft if ensemble == "soft" else expected
+                assert [result["predictions"][model_name] for result in results] == model_expected[model_name]
+            print(f"{f'multi-model, n_jobs={n_jobs}, {ensemble}':<30} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
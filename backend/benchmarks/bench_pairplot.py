@@ -0,0 +1,47 @@
+"""Time the pairplot as uploads grow, with and without the sample cap.
+
+Run from the backend directory (upload sizes can be passed as arguments):
+    python -m benchmarks.bench_pairplot 1000 10000 100000
+"""
+import sys
+import time
+
+from app.config import Config
+from app.services.visualization_service import VisualizationService
+from benchmarks.stress_visualization_threads import make_frame
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DPI = 110
+
+
+def time_pairplot(service, df_viz):
+    start = time.perf_counter()
+    fig = service.plot_numerical_features_pairplot(df_viz)
+    draw_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image_data = service.encode_figure(fig, "png", DPI)
+    encode_time = time.perf_counter() - start
+
+    return draw_time, encode_time, len(image_data)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    service = VisualizationService()
+    default_cap = Config.PAIRPLOT_MAX_POINTS
+
+    print(f"{'rows':>8} {'mode':<10} {'draw (s)':>9} {'encode (s)':>11} {'size (KB)':>10}")
+    for n_rows in sizes:
+        df_viz = make_frame(service, n_rows)
+
+        for mode, cap in [("all rows", n_rows), ("sampled", default_cap)]:
+            Config.PAIRPLOT_MAX_POINTS = cap
+            draw_time, encode_time, size = time_pairplot(service, df_viz)
+            print(f"{n_rows:>8} {mode:<10} {draw_time:>9.2f} {encode_time:>11.2f} {size / 1024:>10.0f}")
+
+    Config.PAIRPLOT_MAX_POINTS = default_cap
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Time batch predictions of overlapping extracts with and without the prediction cache.
+
+The second extract shares a fraction of its visits with the first one, as when a clinic re-uploads
+an extract with a few new visits. Checks that cached and uncached results are identical.
+Run from the backend directory (the number of rows can be passed as an argument):
+    python -m benchmarks.bench_prediction_cache 100000
+"""
+import io
+import sys
+import time
+
+import pandas as pd
+
+from app.config import Config
+from app.core.pipeline import AlzheimersPipeline
+from app.pipeline import prediction_cache
+from benchmarks.bench_clean_data import make_upload
+
+DEFAULT_ROWS = 100_000
+OVERLAPS = [0.0, 0.5, 0.9, 1.0]
+MODEL_NAMES = ["svm", "naiveBayes", "decisionTree"]
+
+
+def to_csv(df):
+    buffer = io.StringIO()
+    buffer.write("NACC export\n")
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def predict(pipeline, content, model_name):
+    start = time.perf_counter()
+    results = pipeline.predict_batch(io.StringIO(content), model_name)
+    return time.perf_counter() - start, results
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    Config.PREDICTION_CACHE_MAX_ENTRIES = max(Config.PREDICTION_CACHE_MAX_ENTRIES, 2 * n_rows)
+    pipeline = AlzheimersPipeline()
+
+    first = make_upload(n_rows, seed=0)
+    fresh = make_upload(n_rows, seed=1)
+
+    print(f"{'model':<13} {'overlap':>7} {'uncached (s)':>13} {'cached (s)':>11} {'hit rate':>9}")
+    for model_name in MODEL_NAMES:
+        for overlap in OVERLAPS:
+            n_shared = int(n_rows * overlap)
+            # Same visits under new ids, so that only the feature values make them equal
+            second = pd.concat([first.iloc[:n_shared], fresh.iloc[n_shared:]], ignore_index=True)
+            second["NACCID"] = [f"NEW{i:07d}" for i in range(n_rows)]
+            first_content, second_content = to_csv(first), to_csv(second)
+
+            Config.PREDICTION_CACHE_ENABLED = False
+            uncached_time, expected = predict(pipeline, second_content, model_name)
+
+            Config.PREDICTION_CACHE_ENABLED = True
+            prediction_cache.clear()
+            predict(pipeline, first_content, model_name)
+            hits_before = prediction_cache.hits
+            cached_time, actual = predict(pipeline, second_content, model_name)
+
+            assert actual == expected
+            hit_rate = (prediction_cache.hits - hits_before) / n_rows
+            print(f"{model_name:<13} {overlap:>7.0%} {uncached_time:>13.2f} {cached_time:>11.2f} {hit_rate:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
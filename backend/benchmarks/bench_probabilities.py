@@ -0,0 +1,59 @@
+"""Time batch predictions with class probabilities: a predict pass followed by a predict_proba pass, against
+the single pass of `Predictor.predict_batch(X, probabilities=True)`, for each model and batch size.
+
+Checks that the classes are the most probable ones, and counts the rows where they differ from the classes
+predicted without probabilities (only an SVC's Platt-scaled probabilities can disagree with its predict).
+Run from the backend directory:
+    python -m benchmarks.bench_probabilities
+"""
+import time
+
+from app.pipeline import DataPreprocessor, Predictor
+from app.pipeline.predictor import _probability_columns
+from benchmarks.bench_clean_data import make_upload
+from benchmarks.timing import best_of
+
+BATCH_SIZES = [1, 100, 10_000, 100_000]
+MODEL_NAMES = ["svm", "naiveBayes", "decisionTree"]
+
+
+def main():
+    preprocessor = DataPreprocessor()
+    preprocessor.load()
+    df = make_upload(max(BATCH_SIZES)).set_index("NACCID")
+    X_all, _ = preprocessor.transform(preprocessor.prepare_prediction_data(df))
+
+    print(f"{'model':<13} {'rows':>7} {'classes only (ms)':>18} {'two passes (ms)':>16} {'one pass (ms)':>14} {'other class':>12}")
+    for model_name in MODEL_NAMES:
+        predictor = Predictor()
+        predictor.set_best_model(model_name)
+        model = predictor.best_model
+        if not hasattr(model, "predict_proba"):
+            print(f"{model_name:<13} no predict_proba, train it with Config.SVM_PROBABILITY")
+            continue
+
+        for batch_size in BATCH_SIZES:
+            X = X_all.iloc[:batch_size]
+            repeats = 5 if batch_size < 100_000 else 2
+
+            without_probabilities = [result["NACCUDSD"] for result in predictor.predict_batch(X)]
+            results = predictor.predict_batch(X, probabilities=True)
+            assert all(result["confidence"] == max(result["probabilities"].values()) for result in results)
+            n_other_class = sum(result["NACCUDSD"] != label for result, label in zip(results, without_probabilities))
+
+            def two_passes():
+                predictions = model.predict(X)
+                probability_columns = _probability_columns(model, predictions, model.predict_proba(X))
+                return predictor.build_results(X, predictions, probability_columns)
+
+            classes_time, _ = best_of(predictor.predict_batch, X, repeats=repeats)
+            two_passes_time, _ = best_of(two_passes, repeats=repeats)
+            one_pass_time, _ = best_of(lambda: predictor.predict_batch(X, probabilities=True), repeats=repeats)
+            print(
+                f"{model_name:<13} {batch_size:>7} {classes_time * 1000:>18.2f} {two_passes_time * 1000:>16.2f} "
+                f"{one_pass_time * 1000:>14.2f} {n_other_class:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare training time and prediction latency of the SVM variants built by ModelTrainer.
+
+Run from the backend directory (training sizes can be passed as arguments):
+    python -m benchmarks.bench_svm_modes 2000 5000 10000
+"""
+import sys
+import time
+import pandas as pd
+from sklearn.datasets import make_classification
+
+from app.config import Config
+from app.pipeline import ModelTrainer
+
+DEFAULT_SIZES = [2_000, 5_000, 10_000]
+PREDICT_ROWS = 1_000
+
+# (label, SVM_PROBABILITY, SVM_KERNEL_APPROXIMATION)
+VARIANTS = [
+    ("rbf svc + platt", True, None),
+    ("rbf svc", False, None),
+    ("nystroem + linear", False, "nystroem"),
+    ("rff + linear", False, "rff"),
+]
+
+
+def make_data(n_rows, seed=0):
+    # Same width and number of classes as the transformed NACC matrix
+    X, y = make_classification(
+        n_samples=n_rows + PREDICT_ROWS, n_features=10, n_informative=6,
+        n_classes=4, random_state=seed
+    )
+    X = pd.DataFrame(X, columns=Config.FEATURES)
+    return X[:n_rows], y[:n_rows], X[n_rows:]
+
+
+def build_svm(probability, approximation, X_train):
+    Config.SVM_PROBABILITY = probability
+    Config.SVM_KERNEL_APPROXIMATION = approximation
+    Config.SVM_APPROX_MIN_SAMPLES = 0
+
+    trainer = ModelTrainer()
+    if trainer._use_approximate_svm(X_train):
+        return trainer._create_approximate_svm()
+    return trainer.models["svm"]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'rows':>7} {'variant':<20} {'train (s)':>10} {'predict 1 (ms)':>15} {f'predict {PREDICT_ROWS} (ms)':>18}")
+    for n_rows in sizes:
+        X_train, y_train, X_new = make_data(n_rows)
+
+        for label, probability, approximation in VARIANTS:
+            model = build_svm(probability, approximation, X_train)
+
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            train_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for i in range(100):
+                model.predict(X_new.iloc[[i]])
+            single_latency = (time.perf_counter() - start) / 100 * 1000
+
+            start = time.perf_counter()
+            model.predict(X_new)
+            batch_latency = (time.perf_counter() - start) * 1000
+
+            print(f"{n_rows:>7} {label:<20} {train_time:>10.2f} {single_latency:>15.2f} {batch_latency:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
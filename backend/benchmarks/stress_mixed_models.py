@@ -0,0 +1,68 @@
+"""Check that concurrent batch predictions for different models on one shared pipeline never get the
+results of another model, in their responses or in the prediction cache.
+
+Threads call `predict_batch` with alternating models on the same `AlzheimersPipeline` (as the routes do),
+then every model predicts the upload again sequentially: the cached results must still be its own.
+Run from the backend directory:
+    python -m benchmarks.stress_mixed_models
+"""
+import io
+import threading
+
+from app.config import Config
+from app.core.pipeline import AlzheimersPipeline
+from app.pipeline import prediction_cache
+from benchmarks.bench_clean_data import make_upload
+from benchmarks.bench_prediction_cache import to_csv
+
+MODEL_NAMES = ["svm", "decisionTree"]
+THREADS_PER_MODEL = 3
+CALLS_PER_THREAD = 15
+N_ROWS = 2000
+
+
+def classes(results):
+    return [result["NACCUDSD"] for result in results]
+
+
+def main():
+    content = to_csv(make_upload(N_ROWS))
+    pipeline = AlzheimersPipeline()
+
+    Config.PREDICTION_CACHE_ENABLED = False
+    expected = {model_name: classes(pipeline.predict_batch(io.StringIO(content), model_name)) for model_name in MODEL_NAMES}
+    n_disagreeing = sum(a != b for a, b in zip(*expected.values()))
+    print(f"{N_ROWS} rows, the models disagree on {n_disagreeing}")
+
+    for cache_enabled in (False, True):
+        Config.PREDICTION_CACHE_ENABLED = cache_enabled
+        prediction_cache.clear()
+        mismatches = []
+
+        def client(model_name):
+            for _ in range(CALLS_PER_THREAD):
+                if classes(pipeline.predict_batch(io.StringIO(content), model_name)) != expected[model_name]:
+                    mismatches.append(model_name)
+
+        threads = [
+            threading.Thread(target=client, args=(model_name,))
+            for _ in range(THREADS_PER_MODEL) for model_name in MODEL_NAMES
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        n_calls = len(threads) * CALLS_PER_THREAD
+        print(f"cache {'on' if cache_enabled else 'off'}: {len(mismatches)} of {n_calls} concurrent responses from another model")
+        assert not mismatches
+
+        # What the cache serves afterwards must be each model's own predictions
+        for model_name in MODEL_NAMES:
+            assert classes(pipeline.predict_batch(io.StringIO(content), model_name)) == expected[model_name], model_name
+
+    print("cache clean")
+
+
+if __name__ == "__main__":
+    main()
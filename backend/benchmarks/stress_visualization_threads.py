@@ -0,0 +1,79 @@
+"""Render every chart from many threads at once and check the images against a serial render.
+
+Charts are drawn on standalone figures, so concurrent requests must produce exactly
+the same images as one request at a time. Run from the backend directory:
+    python -m benchmarks.stress_visualization_threads 8 3
+(number of threads, renders of each chart per thread)
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.routes.visualization_routes import VISUALIZATION_ENDPOINT_MAP
+from app.services.visualization_service import VisualizationService
+
+N_ROWS = 500
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def make_frame(service, n_rows=N_ROWS, seed=0):
+    """A frame shaped like the output of `VisualizationService.prepare_data`."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "AGE": rng.integers(55, 95, n_rows),
+        "EDUC": rng.integers(8, 21, n_rows),
+        "UDSBENTC": rng.integers(0, 18, n_rows),
+        "SEX": rng.integers(1, 3, n_rows),
+        "MOCATRAI": rng.integers(0, 2, n_rows),
+        "AMNDEM": rng.integers(0, 2, n_rows),
+        "NACCPPAG": rng.choice([0, 1, 8], n_rows),
+        "AMYLPET": rng.integers(0, 2, n_rows),
+        "DYSILL": rng.integers(0, 2, n_rows),
+        "DYSILLIF": rng.choice([0, 1, 8], n_rows),
+        "NACCUDSD": rng.integers(1, 5, n_rows),
+    })
+    df["TARGET_LABEL"] = df["NACCUDSD"].map(service.target_labels_display)
+    df["SEX_LABEL"] = df["SEX"].map(service.sex_labels)
+    df["AMNDEM_LABEL"] = df["AMNDEM"].map(service.amndem_labels)
+    df["DYSILL_LABEL"] = df["DYSILL"].map(service.dysill_labels)
+    df["AMYLPET_LABEL"] = df["AMYLPET"].map(service.amylpet_labels)
+    return df
+
+
+def main():
+    n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    service = VisualizationService()
+    df_viz = make_frame(service)
+    method_names = list(VISUALIZATION_ENDPOINT_MAP.values())
+
+    start = time.perf_counter()
+    expected = {name: service.render(name, df_viz) for name in method_names}
+    serial_time = time.perf_counter() - start
+
+    tasks = [name for name in method_names for _ in range(n_threads * repeats)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = list(executor.map(lambda name: (name, service.render(name, df_viz)), tasks))
+    threaded_time = time.perf_counter() - start
+
+    mismatches = 0
+    for name, image in results:
+        if not image.startswith(PNG_SIGNATURE) or image != expected[name]:
+            mismatches += 1
+            print(f"Mismatch: {name}")
+
+    print(f"serial: {len(method_names)} charts in {serial_time:.2f}s")
+    print(f"threaded: {len(tasks)} charts on {n_threads} threads in {threaded_time:.2f}s")
+    print(f"mismatches: {mismatches}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
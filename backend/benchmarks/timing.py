@@ -0,0 +1,12 @@
+"""Timing helper shared by the benchmarks."""
+import time
+
+
+def best_of(func, *args, repeats=3):
+    """Call `func(*args)` `repeats` times, return the fastest time and the result of the last call."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
@@ -6,6 +6,9 @@ import { db } from "@/config/firebase";
 // API Base URL
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// Interval between training job status checks
+const TRAINING_POLL_INTERVAL_MS = 2000;
+
 // Model performance metrics
 export interface ModelMetrics {
     f1Score: number;
@@ -102,7 +105,9 @@ export const PredictionService = {
         throw new Error(error.message || "Failed to train models.");
       }
 
-      const results = await response.json();
+      // Training runs as a background job, poll until it has finished
+      const job = await response.json();
+      const results = await this.waitForTrainingJob(job.data.jobId, token);
 
       // Save to Firestore
       try {
@@ -122,6 +127,35 @@ export const PredictionService = {
     }
   },
 
+  // Poll a training job until it completes or fails
+  async waitForTrainingJob(jobId: string, token?: string): Promise<{ data: TrainingResult }> {
+    while (true) {
+      const response = await fetch(`${API_BASE_URL}/train/${jobId}`, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+
+      if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.message || "Failed to get the training status.");
+      }
+
+      const job = (await response.json()).data;
+
+      if (job.status === "completed") {
+        return { data: job.result };
+      }
+
+      if (job.status === "failed") {
+        throw new Error(job.error || "Failed to train models.");
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, TRAINING_POLL_INTERVAL_MS));
+    }
+  },
+
   // Dataset upload - Predict from CSV
   async predictFromCSV(file: File): Promise<PredictionResult[]> {
     try {
@@ -43,76 +43,108 @@ export const VisualizationService = {
         }
       },
 
-    // Generate all visualizations
+    // Generate all visualizations in a single dashboard request
     async generateAllVisualizations(file: File): Promise<VisualizationResult[]> {
-        const results: VisualizationResult[] = [];
-
-        // Make the requests
-        const promises = VISUALIZATION_ENDPOINTS.map(async (endpoint) => {
-            try {
-                console.log(`Generating ${endpoint.label}...`);
-
-                const bestModel = await this.getBestModel();
-
-                const response: VisualizationResponse = await this.generateVisualization(endpoint.name, file, bestModel);
-
-                if (response.status === "success") {
-                    const imageData = response.imageData;
-                    const contentType = response.contentType;
-                    
-                    // Convert base64 to blob
-                    const base64Data = imageData.replace(/^data:image\/\w+;base64,/, '');
-                    const byteCharacters = atob(base64Data);
-                    const byteNumbers = new Array(byteCharacters.length);
-                    for (let i = 0; i < byteCharacters.length; i++) {
-                        byteNumbers[i] = byteCharacters.charCodeAt(i);
-                    }
-                    const byteArray = new Uint8Array(byteNumbers);
-                    const blob = new Blob([byteArray], { type: contentType });
-                    
-                    // Create object URL for the blob
-                    const imageUrl = URL.createObjectURL(blob);
-
-                    return {
-                        name: endpoint.name,
-                        label: endpoint.label,
-                        imageUrl,
-                        error: ''
-                    }
-                }
-            } catch (error) {
-                console.error(`Failed to generate ${endpoint.label}:`, error);
+        const bestModel = await this.getBestModel();
+
+        // Get current user token
+        const token = await auth.currentUser?.getIdToken();
+
+        // Create form data
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('modelName', bestModel);
+        formData.append('charts', VISUALIZATION_ENDPOINTS.map((endpoint) => endpoint.name).join(','));
+
+        // Make API request
+        const response = await fetch(`${API_BASE_URL}/visualizations/dashboard`, {
+            method: "POST",
+            headers: {
+                'Authorization': `Bearer ${token}`
+            },
+            body: formData
+        });
+
+        const result = await response.json();
+
+        if (!response.ok || result.status !== "success") {
+            throw new Error(result.error || "Failed to generate visualizations.");
+        }
+
+        return VISUALIZATION_ENDPOINTS.map((endpoint) => {
+            const chart = result.data.charts[endpoint.name];
+
+            if (!chart || chart.error) {
+                console.error(`Failed to generate ${endpoint.label}:`, chart?.error);
                 return {
                     name: endpoint.name,
                     label: endpoint.label,
                     imageUrl: '',
-                    error: error instanceof Error ? error.message : "Unknown error"
+                    error: chart?.error || "Unknown error"
                 };
             }
+
+            return {
+                name: endpoint.name,
+                label: endpoint.label,
+                imageUrl: this.toImageUrl(chart.imageData, chart.contentType),
+                error: ''
+            };
         });
+    },
 
-        // Wait for all visualizations to complete
-        const visualizationResults = await Promise.allSettled(promises);
+    // Convert base64 image data to an object URL
+    toImageUrl(imageData: string, contentType: string): string {
+        // Convert base64 to blob
+        const base64Data = imageData.replace(/^data:image\/\w+;base64,/, '');
+        const byteCharacters = atob(base64Data);
+        const byteNumbers = new Array(byteCharacters.length);
+        for (let i = 0; i < byteCharacters.length; i++) {
+            byteNumbers[i] = byteCharacters.charCodeAt(i);
+        }
+        const byteArray = new Uint8Array(byteNumbers);
+        const blob = new Blob([byteArray], { type: contentType });
+        
+        // Create object URL for the blob
+        return URL.createObjectURL(blob);
+    },
 
-        visualizationResults.forEach((result) => {
-            if (result.status == "fulfilled") {
-                if (result.value != undefined)
-                    results.push(result.value);
-            }
+    // Upload a dataset for visualization and return its id
+    async uploadDataset(file: File): Promise<string> {
+        // Get current user token
+        const token = await auth.currentUser?.getIdToken();
+
+        // Create form data
+        const formData = new FormData();
+        formData.append('file', file);
+
+        // Make API request
+        const response = await fetch(`${API_BASE_URL}/visualizations/datasets`, {
+            method: "POST",
+            headers: {
+                'Authorization': `Bearer ${token}`
+            },
+            body: formData
         });
 
-        return results
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || "Failed to upload the dataset.");
+        }
+
+        const result = await response.json();
+        return result.data.datasetId;
     },
 
     // Generate a single visualization
-    async generateVisualization(endpoint: string, file: File, bestModel: string): Promise<VisualizationResponse> {
+    async generateVisualization(endpoint: string, datasetId: string, bestModel: string): Promise<VisualizationResponse> {
         try {
             // Get current user token
             const token = await auth.currentUser?.getIdToken();
 
             // Create form data
             const formData = new FormData();
-            formData.append('file', file);
+            formData.append('datasetId', datasetId);
             formData.append('modelName', bestModel)
             
             // Make API request